@@ -1,5 +1,9 @@
+import atexit
+import queue
 import threading
+import time
 from datetime import datetime, timedelta
+from sqlalchemy import insert
 from database import db, Alert
 from config import Config
 
@@ -20,10 +24,27 @@ ALERT_COOLDOWNS = {
     'auto_submit':        0,   # One-time event
     'camera_issue':       0,   # One-time event
     'manual_flag':        0,   # Invigilator action — always create
+    # Browser-side checks posted to /proctoring_alert
+    'fullscreen_exit':   20,
+    'copy_attempt':      20,
+    'view_source':       20,
+    'screenshot':        20,
+    'devtools_detected': 20,
+    'screen_sharing':    20,
+    'multiple_monitors': 20,
+    'poor_lighting':     20,
 }
 
+# Types a student's browser may report; the rest are raised server-side only
+CLIENT_ALERT_TYPES = frozenset(ALERT_COOLDOWNS) - {'help_request', 'auto_submit', 'camera_issue', 'manual_flag'}
+
 DEFAULT_COOLDOWN = 20  # Fallback for any alert type not listed above
 
+# Queued alerts are written in batches: whichever comes first of
+# ALERT_FLUSH_BATCH rows or ALERT_FLUSH_INTERVAL seconds after the first one.
+ALERT_FLUSH_BATCH = 200
+ALERT_FLUSH_INTERVAL = 0.25
+
 
 class AlertSystem:
     def __init__(self):
@@ -31,16 +52,23 @@ class AlertSystem:
         self._cooldowns: dict[int, dict[str, datetime]] = {}
         self._lock = threading.Lock()
 
+        # Write-behind queue for alerts raised from HTTP routes
+        self._queue = queue.Queue()
+        self._flusher = None
+        self._app = None
+
     # ──────────────────────────────────────────────────────────────────────
     # Core alert creation
     # ──────────────────────────────────────────────────────────────────────
 
-    def create_alert(self, session_id, alert_type, severity, description, screenshot_path=None):
+    def create_alert(self, session_id, alert_type, severity, description, screenshot_path=None,
+                     respect_cooldown=True):
         """
         Create an alert if the cooldown period for this alert type has passed.
         Thread-safe. Returns the Alert object if created, or None if suppressed.
+        respect_cooldown=False always writes (manual invigilator actions).
         """
-        if not self._check_cooldown(session_id, alert_type):
+        if respect_cooldown and not self._check_cooldown(session_id, alert_type):
             return None  # Too soon — suppressed to avoid spam
 
         alert = Alert(
@@ -62,6 +90,62 @@ class AlertSystem:
             print(f"[AlertSystem] Failed to save alert ({alert_type}): {e}")
             return None
 
+    def enqueue_alert(self, session_id, alert_type, severity, description, screenshot_path=None):
+        """
+        Queue an alert for the background flusher instead of committing it
+        on the request thread. Same cooldown rules as create_alert().
+        Returns True if queued, False if suppressed.
+        Critical alerts skip the queue so they reach the dashboard immediately;
+        everything is written synchronously if the flusher isn't running.
+        """
+        if self._flusher is None or severity == Config.ALERT_CRITICAL:
+            return self.create_alert(session_id, alert_type, severity, description,
+                                     screenshot_path) is not None
+
+        if not self._check_cooldown(session_id, alert_type):
+            return False
+
+        self._update_cooldown(session_id, alert_type)
+        self._queue.put({
+            'session_id': session_id,
+            'alert_type': alert_type,
+            'severity': severity,
+            'description': description,
+            'screenshot_path': screenshot_path,
+            'timestamp': datetime.utcnow(),
+            'notified': False,
+        })
+        return True
+
+    def start_flusher(self, app):
+        """Start the daemon thread that drains queued alerts into the DB."""
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._app = app
+            self._flusher = threading.Thread(
+                target=self._flush_loop,
+                name='alert-flusher',
+                daemon=True
+            )
+        self._flusher.start()
+        # Daemon threads die with the interpreter; write whatever is still queued
+        atexit.register(self.flush)
+
+    def flush(self):
+        """Synchronously write every alert currently queued."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= ALERT_FLUSH_BATCH:
+                self._write_batch(batch)
+                batch = []
+        if batch:
+            self._write_batch(batch)
+
     # ──────────────────────────────────────────────────────────────────────
     # Monitor check methods — called by app.py routes and monitor callbacks
     # ──────────────────────────────────────────────────────────────────────
@@ -149,7 +233,13 @@ class AlertSystem:
         else:
             description = f"Suspicious audio detected (level: {level})"
 
-        self.check_audio_violation(True, session_id)
+        # Monitor threads fire at multi-Hz: queue rather than commit per event
+        self.enqueue_alert(
+            session_id,
+            'suspicious_audio',
+            Config.ALERT_MEDIUM,
+            'Suspicious audio activity detected'
+        )
 
     def screen_alert_callback(self, session_id, event, count):
         """
@@ -159,9 +249,14 @@ class AlertSystem:
         event_type = event.get('type', 'tab_switch')
 
         if event_type == 'tab_switch':
-            self.check_tab_switch(session_id)
+            self.enqueue_alert(
+                session_id,
+                'tab_switch',
+                Config.ALERT_HIGH,
+                'Student switched tabs or lost focus'
+            )
         elif event_type == 'window_blur':
-            self.create_alert(
+            self.enqueue_alert(
                 session_id,
                 'window_blur',
                 Config.ALERT_HIGH if count >= 5 else Config.ALERT_MEDIUM,
@@ -199,6 +294,49 @@ class AlertSystem:
             'low':      len([a for a in alerts if a.severity == Config.ALERT_LOW])
         }
 
+    # ──────────────────────────────────────────────────────────────────────
+    # Internal flusher
+    # ──────────────────────────────────────────────────────────────────────
+
+    def _flush_loop(self):
+        """Block for the first queued alert, then collect a batch and write it."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + ALERT_FLUSH_INTERVAL
+
+            while len(batch) < ALERT_FLUSH_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        """Insert a batch of alert rows with one executemany + one commit."""
+        with self._app.app_context():
+            try:
+                db.session.execute(insert(Alert), batch)
+                db.session.commit()
+                return
+            except Exception as e:
+                db.session.rollback()
+                print(f"[AlertSystem] Batch of {len(batch)} alerts failed, retrying row by row: {e}")
+
+            # One bad row (e.g. its session was deleted while queued) must not
+            # take the rest of the batch with it
+            for row in batch:
+                try:
+                    db.session.execute(insert(Alert), [row])
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[AlertSystem] Dropped alert ({row['alert_type']}) "
+                          f"for session {row['session_id']}: {e}")
+
     # ──────────────────────────────────────────────────────────────────────
     # Internal cooldown helpers
     # ──────────────────────────────────────────────────────────────────────
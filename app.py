@@ -34,9 +34,10 @@ except ImportError:
     class ScreenMonitor: pass
 
 try:
-    from alert_system import AlertSystem
+    from alert_system import AlertSystem, CLIENT_ALERT_TYPES
 except ImportError:
     class AlertSystem: pass
+    CLIENT_ALERT_TYPES = frozenset()
 
 try:
     from report_generator import ReportGenerator
@@ -49,9 +50,10 @@ except ImportError:
     class StudentRegistration: pass
 
 try:
-    from sms_service import SMSService
+    from sms_service import sms_service
 except ImportError:
     class SMSService: pass
+    sms_service = SMSService()
 
 try:
     from auto_grader import AutoGrader
@@ -60,11 +62,13 @@ except ImportError:
 
 from email_service import mail, EmailService
 from api import api
-from auth.authentication import AuthenticationManager, SessionManager, PasswordManager
+from auth.authentication import SessionManager, PasswordManager
 from utils.error_handlers import register_error_handlers
 from security import SecurityUtils, block_automation, verify_exam_device
 from functools import wraps
 import threading
+import tempfile
+from types import SimpleNamespace
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_migrate import Migrate
@@ -82,7 +86,9 @@ def add_ngrok_header(response):
     )
     return response
 
-app.config.from_object(get_config())
+# Resolve the environment's config class once and use it for both settings and init hooks
+app_config = get_config()
+app.config.from_object(app_config)
 
 db.init_app(app)
 migrate = Migrate(app, db)
@@ -90,11 +96,18 @@ mail.init_app(app)
 # csrf = CSRFProtect(app)
 app.register_blueprint(api)
 
-Config.init_app(app)
+app_config.init_app(app)
+
+
+@app.cli.command('check-password-cost')
+def check_password_cost():
+    """Time one password hash verify against PASSWORD_HASH_TARGET_MS (flask check-password-cost)."""
+    elapsed_ms = PasswordManager.check_cost(app.logger)
+    print(f'Password verify: {elapsed_ms:.0f}ms (target {Config.PASSWORD_HASH_TARGET_MS}ms)')
 
 # Exempt JSON API endpoints from CSRF
 API_ROUTES = [
-    'start_exam', 'end_exam', 'submit_answer', 'proctoring_alert',
+    'start_exam', 'end_exam', 'submit_answer', 'submit_answers', 'proctoring_alert',
     'tab_switch', 'window_event', 'upload_snapshot', 'process_snapshot',
     'request_help', 'camera_issue', 'bulk_import_progress_stream',
     'delete_student', 'delete_cohort', 'delete_all_students',
@@ -108,13 +121,36 @@ for route_name in API_ROUTES:
     if view:
         csrf.exempt(view)
 
-from sqlalchemy import event
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.orm import joinedload
 import re
 
 def is_sqlite(uri):
     return uri.startswith('sqlite://')
 
 with app.app_context():
+    db_ping_interval = app.config.get('DB_PING_INTERVAL', 60)
+
+    # Cheaper replacement for pool_pre_ping: only connections idle for longer
+    # than DB_PING_INTERVAL get a SELECT 1 before being handed out
+    @event.listens_for(db.engine, "checkout")
+    def ping_idle_connection(dbapi_connection, connection_record, connection_proxy):
+        if time.monotonic() - connection_record.info.get('last_used', 0) < db_ping_interval:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            # The pool discards this connection and retries with a fresh one
+            raise DisconnectionError()
+        finally:
+            cursor.close()
+
+    @event.listens_for(db.engine, "checkin")
+    def mark_connection_used(dbapi_connection, connection_record):
+        connection_record.info['last_used'] = time.monotonic()
+
     if is_sqlite(app.config.get('SQLALCHEMY_DATABASE_URI', '')):
         @event.listens_for(db.engine, "connect")
         def sqlite_on_connect(dbapi_connection, connection_record):
@@ -122,9 +158,10 @@ with app.app_context():
             cursor.execute("PRAGMA foreign_keys=ON")
             cursor.execute("PRAGMA busy_timeout=30000")
             cursor.execute("PRAGMA journal_mode=WAL")
+            # WAL stays crash-safe at NORMAL; FULL would fsync on every commit
+            cursor.execute("PRAGMA synchronous=NORMAL")
             cursor.close()
 
-auth_manager = AuthenticationManager()
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
@@ -133,11 +170,12 @@ limiter = Limiter(
 )
 
 import json
+import orjson
 import secrets
 
 @app.template_filter('from_json')
 def from_json_filter(s):
-    return json.loads(s) if s else {}
+    return orjson.loads(s) if s else {}
 
 @app.template_global('csrf_token')
 def csrf_token():
@@ -154,8 +192,8 @@ screen_monitor = ScreenMonitor()
 alert_system = AlertSystem()
 report_generator = ReportGenerator()
 student_registration = StudentRegistration()
-sms_service = SMSService()
 auto_grader = AutoGrader()
+alert_system.start_flusher(app)
 
 def on_audio_alert(session_id, event):
     with app.app_context():
@@ -226,6 +264,38 @@ def get_current_institution_id():
         return student.institution_id if student else None
     return None
 
+# Per-exam question lists are read on every manage/review page load but only
+# change when an invigilator edits them — keep a short-lived copy per process.
+QUESTION_CACHE_TTL = 30
+QUESTION_CACHE_SIZE = 128
+_question_cache = {}
+_question_cache_lock = threading.Lock()
+
+def get_exam_questions(exam_name):
+    """Ordered questions for an exam as read-only rows, cached for QUESTION_CACHE_TTL seconds."""
+    now = time.monotonic()
+    with _question_cache_lock:
+        hit = _question_cache.get(exam_name)
+    if hit and hit[0] > now:
+        return hit[1]
+    columns = [c.name for c in Question.__table__.columns]
+    # options JSON is decoded once per cache fill rather than on every render
+    questions = tuple(
+        SimpleNamespace(**{name: getattr(q, name) for name in columns}, parsed_options=q.parsed_options)
+        for q in Question.query.filter_by(exam_name=exam_name).order_by(Question.order).all()
+    )
+    with _question_cache_lock:
+        _question_cache.pop(exam_name, None)
+        if len(_question_cache) >= QUESTION_CACHE_SIZE:
+            _question_cache.pop(next(iter(_question_cache)))
+        _question_cache[exam_name] = (now + QUESTION_CACHE_TTL, questions)
+    return questions
+
+def invalidate_exam_questions(exam_name):
+    with _question_cache_lock:
+        _question_cache.pop(exam_name, None)
+    AutoGrader.invalidate_exam_cache()
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -393,8 +463,9 @@ def admin_change_password():
 @app.route('/invigilator/dashboard')
 @login_required('invigilator')
 def invigilator_dashboard():
-    active_sessions = ExamSession.query.filter_by(status='in_progress').all()
-    recent_alerts = Alert.query.order_by(Alert.timestamp.desc()).limit(10).all()
+    active_sessions = ExamSession.query.options(joinedload(ExamSession.student)).filter_by(status='in_progress').all()
+    recent_alerts = Alert.query.options(joinedload(Alert.session).joinedload(ExamSession.student)).order_by(
+        Alert.timestamp.desc()).limit(10).all()
     all_students = Student.query.all()
     cohorts = sorted(set(s.cohort for s in all_students if s.cohort))
     return render_template('invigilator_dashboard.html',
@@ -573,7 +644,9 @@ def submit_answer():
     session_id = data.get('session_id')
     question_id = data.get('question_id')
     answer_text = data.get('answer_text')
-    existing = Answer.query.filter_by(session_id=session_id, question_id=question_id).first()
+    existing = db.session.execute(
+        select(Answer).where(Answer.session_id == session_id, Answer.question_id == question_id)
+    ).scalars().first()
     if existing:
         existing.answer_text = answer_text
         existing.submitted_at = datetime.utcnow()
@@ -583,6 +656,44 @@ def submit_answer():
     db.session.commit()
     return jsonify({'success': True})
 
+@app.route('/submit_answers', methods=['POST'])
+@login_required('student')
+@verify_exam_device
+def submit_answers():
+    """Save every answer for a session in one request (the exam page's final submit)"""
+    data = request.json or {}
+    exam_session = _owned_session(data.get('session_id'))
+    if exam_session is None:
+        return jsonify({'success': False, 'message': 'Session not found'}), 404
+    if exam_session.status != 'in_progress':
+        return jsonify({'success': False, 'message': 'Exam is not in progress'}), 400
+
+    # Keys must match the int question_id coming back from the DB
+    answers = {}
+    for a in data.get('answers', []):
+        try:
+            answers[int(a.get('question_id'))] = a.get('answer_text')
+        except (AttributeError, TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'Invalid question id'}), 400
+    if not answers:
+        return jsonify({'success': False, 'message': 'No answers'}), 400
+    known = {qid for (qid,) in db.session.query(Question.id).filter(
+        Question.id.in_(list(answers)), Question.exam_name == exam_session.exam_name)}
+    if len(known) != len(answers):
+        return jsonify({'success': False, 'message': 'Invalid question id'}), 400
+
+    now = datetime.utcnow()
+    existing = dict(db.session.query(Answer.question_id, Answer.id).filter(
+        Answer.session_id == exam_session.id, Answer.question_id.in_(list(answers))).all())
+    if existing:
+        db.session.execute(update(Answer), [
+            {'id': answer_id, 'answer_text': answers[question_id], 'submitted_at': now}
+            for question_id, answer_id in existing.items()
+        ])
+    Answer.bulk_create(exam_session.id, [(q, t) for q, t in answers.items() if q not in existing])
+    db.session.commit()
+    return jsonify({'success': True, 'saved': len(answers)})
+
 @app.route('/start_exam', methods=['POST'])
 @block_automation
 def start_exam():
@@ -694,20 +805,153 @@ def end_exam():
 
     return jsonify({'success': True, 'session_id': session_id})
 
+def _owned_session(raw_session_id):
+    """ExamSession for a client-supplied id, or None unless it exists and belongs to the logged-in student."""
+    try:
+        session_id = int(raw_session_id)
+    except (TypeError, ValueError):
+        return None
+    exam_session = db.session.get(ExamSession, session_id)
+    if exam_session is None or exam_session.student_id != flask_session.get('user_id'):
+        return None
+    return exam_session
+
+@app.route('/proctoring_alert', methods=['POST'])
+@login_required('student')
+def proctoring_alert():
+    data = request.json or {}
+    alert_type = data.get('alert_type')
+    if alert_type not in CLIENT_ALERT_TYPES:
+        return jsonify({'success': False, 'message': 'Unknown alert type'}), 400
+    exam_session = _owned_session(data.get('session_id'))
+    if exam_session is None:
+        return jsonify({'success': False, 'message': 'Session not found'}), 404
+    alert_system.enqueue_alert(
+        exam_session.id,
+        alert_type,
+        Config.ALERT_MEDIUM,
+        data.get('description', '')
+    )
+    return jsonify({'success': True})
+
+@app.route('/camera_issue', methods=['POST'])
+@login_required('student')
+def camera_issue():
+    data = request.json or {}
+    # Camera checks run before the exam starts, so a session-less alert is allowed
+    session_id = None
+    if data.get('session_id') is not None:
+        exam_session = _owned_session(data.get('session_id'))
+        if exam_session is None:
+            return jsonify({'success': False, 'message': 'Session not found'}), 404
+        session_id = exam_session.id
+    # Attribute the alert to the logged-in student, never to client-supplied names
+    student = db.session.get(Student, flask_session['user_id'])
+    if student is None:
+        return jsonify({'success': False, 'message': 'Student not found'}), 404
+    alert_system.enqueue_alert(
+        session_id,
+        'camera_issue',
+        Config.ALERT_MEDIUM,
+        f"Camera issue for {student.name} ({student.student_id}): {data.get('issue')}"
+    )
+    return jsonify({'success': True})
+
+@app.route('/request_help', methods=['POST'])
+@login_required('student')
+def request_help():
+    data = request.json or {}
+    exam_session = _owned_session(data.get('session_id'))
+    if exam_session is None:
+        return jsonify({'success': False, 'message': 'Session not found'}), 404
+    alert_system.enqueue_alert(
+        exam_session.id,
+        'help_request',
+        Config.ALERT_LOW,
+        'Student requested help'
+    )
+    return jsonify({'success': True})
+
+SNAPSHOT_DIR = os.path.join('static', 'snapshots')
+JPEG_MAGIC = b'\xff\xd8\xff'
+# mkstemp creates files 0600; snapshots get the mode a plain open() would give
+# them so nginx (USE_X_ACCEL) can read them as a different user
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+SNAPSHOT_FILE_MODE = 0o644 & ~_UMASK
+
+def _write_snapshot(filepath, snapshot):
+    # Stream to a temp file in the same directory, then atomically swap it in
+    # so get_snapshot never serves a half-written JPEG
+    fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            snapshot.save(f)
+        os.chmod(tmp_path, SNAPSHOT_FILE_MODE)
+        os.replace(tmp_path, filepath)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+@app.route('/upload_snapshot', methods=['POST'])
+@login_required('student')
+def upload_snapshot():
+    # Size is judged from the header before werkzeug parses the multipart body
+    max_bytes = app.config['SNAPSHOT_MAX_BYTES']
+    if request.content_length is None:
+        return jsonify({'success': False, 'message': 'Content-Length required'}), 411
+    if request.content_length > max_bytes + 64 * 1024:  # allowance for multipart framing
+        return jsonify({'success': False, 'message': 'Snapshot too large'}), 413
+
+    snapshot = request.files.get('snapshot')
+    if not snapshot:
+        return jsonify({'success': False, 'message': 'Missing snapshot'}), 400
+    exam_session = _owned_session(request.form.get('session_id'))
+    if exam_session is None:
+        return jsonify({'success': False, 'message': 'Session not found'}), 404
+
+    stream = snapshot.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    if size > max_bytes:
+        return jsonify({'success': False, 'message': 'Snapshot too large'}), 413
+    if stream.read(len(JPEG_MAGIC)) != JPEG_MAGIC:
+        return jsonify({'success': False, 'message': 'Snapshot must be a JPEG'}), 400
+    stream.seek(0)
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    filepath = os.path.join(SNAPSHOT_DIR, f'session_{exam_session.id}_latest.jpg')
+    try:
+        _write_snapshot(filepath, snapshot)
+    except OSError as e:
+        app.logger.error(f'Snapshot write failed for {filepath}: {e}')
+        return jsonify({'success': False, 'message': 'Could not save snapshot'}), 500
+    return jsonify({'success': True})
+
 @app.route('/get_snapshot/<int:session_id>')
 @login_required('invigilator')
 def get_snapshot(session_id):
     from flask import send_file
-    filepath = os.path.join('static', 'snapshots', f'session_{session_id}_latest.jpg')
-    if os.path.exists(filepath):
-        return send_file(filepath, mimetype='image/jpeg')
-    return '', 404
+    filename = f'session_{session_id}_latest.jpg'
+    filepath = os.path.join(SNAPSHOT_DIR, filename)
+    if not os.path.exists(filepath):
+        return '', 404
+    if app.config.get('USE_X_ACCEL'):
+        # nginx streams the file itself via an internal location
+        return Response(headers={
+            'X-Accel-Redirect': app.config['SNAPSHOT_ACCEL_PREFIX'] + filename,
+            'Content-Type': 'image/jpeg'
+        })
+    return send_file(filepath, mimetype='image/jpeg')
 
 @app.route('/api/recent_alerts')
 @limiter.exempt
 @login_required('invigilator')
 def recent_alerts():
-    alerts = Alert.query.order_by(Alert.timestamp.desc()).limit(10).all()
+    alerts = Alert.query.options(joinedload(Alert.session).joinedload(ExamSession.student)).order_by(
+        Alert.timestamp.desc()).limit(10).all()
     alerts_data = []
     for alert in alerts:
         alert_dict = {
@@ -731,11 +975,15 @@ def report(session_id):
 
 @app.route('/report/<int:session_id>/pdf')
 def report_pdf(session_id):
-    pdf_buffer = report_generator.generate_pdf_report(session_id)
-    if not pdf_buffer:
+    from flask import send_file
+    # Spooled file: small reports stay in memory, large ones spill to disk, and
+    # send_file streams it in chunks instead of copying it into the response body
+    pdf_file = report_generator.generate_pdf_report(
+        session_id, tempfile.SpooledTemporaryFile(max_size=1024 * 1024))
+    if not pdf_file:
         return "Report not found", 404
-    return Response(pdf_buffer.getvalue(), mimetype='application/pdf',
-                    headers={'Content-Disposition': f'attachment; filename=exam_report_{session_id}.pdf'})
+    return send_file(pdf_file, mimetype='application/pdf', as_attachment=True,
+                     download_name=f'exam_report_{session_id}.pdf')
 
 @app.route('/admin/reports')
 @admin_required
@@ -799,7 +1047,7 @@ def export_results(cohort):
     ungraded_count = 0
     for session in sessions:
         questions = Question.query.filter_by(exam_name=session.exam_name).all()
-        answers = Answer.query.filter_by(session_id=session.id).all()
+        answers = db.session.execute(select(Answer).where(Answer.session_id == session.id)).scalars().all()
         answer_dict = {a.question_id: a for a in answers}
         for q in questions:
             if q.question_type == 'essay' and answer_dict.get(q.id) and not answer_dict[q.id].graded_at:
@@ -834,7 +1082,8 @@ def export_results(cohort):
 @app.route('/alerts')
 @login_required('invigilator')
 def alerts():
-    all_alerts = Alert.query.order_by(Alert.timestamp.desc()).all()
+    all_alerts = Alert.query.options(joinedload(Alert.session).joinedload(ExamSession.student)).order_by(
+        Alert.timestamp.desc()).all()
     return render_template('alerts.html', alerts=all_alerts, flask_session=flask_session)
 
 @app.route('/exam_schedule')
@@ -848,6 +1097,9 @@ def exam_schedule():
             exams_grouped[exam.exam_name].append(exam)
     return render_template('exam_schedule.html', exams_grouped=dict(exams_grouped), flask_session=flask_session)
 
+# Cap on password-hashing threads per bulk import (leave cores for requests)
+BULK_IMPORT_HASH_WORKERS = 4
+
 @app.route('/bulk_import', methods=['GET', 'POST'])
 @login_required('invigilator')
 def bulk_import():
@@ -855,6 +1107,8 @@ def bulk_import():
         import uuid
         import queue as _queue
         import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from werkzeug.security import generate_password_hash
         
         if not hasattr(app, 'bulk_import_progress'):
             app.bulk_import_progress = {}
@@ -890,8 +1144,7 @@ def bulk_import():
         def _run_import():
             with app.app_context():
                 CHUNK_SIZE = 200
-                rows = list(df.iterrows())
-                total = len(rows)
+                total = len(df)
                 imported = 0
                 skipped = 0
                 skipped_list = []
@@ -899,43 +1152,64 @@ def bulk_import():
                 
                 progress_q.put({'phase': 'validating', 'pct': 0, 'msg': f'Validating {total} rows...'})
                 
-                existing_ids = {s.student_id for s in Student.query.with_entities(Student.student_id).all()}
-                existing_emails = {s.email for s in Student.query.with_entities(Student.email).all()}
+                # Normalise the columns once for the whole frame instead of per row
+                rows = pd.DataFrame({
+                    'row': range(2, total + 2),
+                    'name': df['name'].fillna('').astype(str).str.strip(),
+                    'student_id': df['student_id'].fillna('').astype(str).str.strip(),
+                    'email': df['email'].fillna('').astype(str).str.strip(),
+                    'cohort': df['cohort'].fillna('Default').astype(str).str.strip() if 'cohort' in df else 'Default',
+                })
+                
+                missing = (rows[['name', 'student_id', 'email']] == '').any(axis=1)
+                skipped_list.extend(f"Row {r}: missing required field" for r in rows.loc[missing, 'row'])
+                rows = rows[~missing]
+                
+                # One prefetch of the ids/emails in this file that already exist,
+                # instead of an existence query per row (IN lists chunked for SQLite)
+                wanted_ids = rows['student_id'].tolist()
+                wanted_emails = rows['email'].tolist()
+                existing_ids, existing_emails = set(), set()
+                for i in range(0, len(wanted_ids), 500):
+                    existing_ids.update(sid for (sid,) in db.session.query(Student.student_id).filter(
+                        Student.student_id.in_(wanted_ids[i:i + 500])))
+                    existing_emails.update(em for (em,) in db.session.query(Student.email).filter(
+                        Student.email.in_(wanted_emails[i:i + 500])))
+                
+                duplicate = (rows['student_id'].isin(existing_ids) | rows['email'].isin(existing_emails) |
+                             rows.duplicated('student_id') | rows.duplicated('email'))
+                skipped_list.extend(f"{name} ({sid}) - already exists"
+                                    for name, sid in zip(rows.loc[duplicate, 'name'], rows.loc[duplicate, 'student_id']))
+                rows = rows[~duplicate]
+                skipped = total - len(rows)
+                
+                records = rows.to_dict('records')
+                progress_q.put({'phase': 'validating', 'pct': 10, 'msg': f'{len(records)} new students, hashing passwords...'})
+                
+                # PBKDF2 is CPU-bound, but hashlib.pbkdf2_hmac releases the GIL, so
+                # threads hash in parallel without starting processes that would
+                # re-import app.py (models, DB engine, alert flusher)
+                passwords = [rec['student_id'] for rec in records]
+                if len(passwords) >= 64:
+                    workers = min(os.cpu_count() or 1, BULK_IMPORT_HASH_WORKERS)
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        hashes = list(pool.map(generate_password_hash, passwords))
+                else:
+                    hashes = [generate_password_hash(p) for p in passwords]
                 
                 batch = []
-                for idx, (_, row) in enumerate(rows):
-                    sid = str(row.get('student_id', '')).strip()
-                    email = str(row.get('email', '')).strip()
-                    name = str(row.get('name', '')).strip()
-                    
-                    if not sid or not email or not name:
-                        skipped += 1
-                        skipped_list.append(f"Row {idx+2}: missing required field")
-                        continue
-                    
-                    if sid in existing_ids or email in existing_emails:
-                        skipped += 1
-                        skipped_list.append(f"{name} ({sid}) - already exists")
-                        continue
-                    
-                    password = sid
-                    s = Student(
-                        name=name,
-                        student_id=sid,
-                        email=email,
-                        cohort=str(row.get('cohort', 'Default')).strip(),
+                for rec, password, password_hash in zip(records, passwords, hashes):
+                    batch.append(Student(
+                        name=rec['name'],
+                        student_id=rec['student_id'],
+                        email=rec['email'],
+                        cohort=rec['cohort'],
                         email_verified=True,
-                        institution_id=inst_id
-                    )
-                    s.set_password(password)
-                    batch.append(s)
-                    credentials.append({'name': name, 'student_id': sid, 'email': email, 'password': password})
-                    existing_ids.add(sid)
-                    existing_emails.add(email)
-                    
-                    if idx % 50 == 0:
-                        pct = int((idx / total) * 40)
-                        progress_q.put({'phase': 'validating', 'pct': pct, 'msg': f'Validated {idx}/{total}...'})
+                        institution_id=inst_id,
+                        password_hash=password_hash
+                    ))
+                    credentials.append({'name': rec['name'], 'student_id': rec['student_id'],
+                                        'email': rec['email'], 'password': password})
                 
                 total_to_insert = len(batch)
                 progress_q.put({'phase': 'importing', 'pct': 40, 'msg': f'Inserting {total_to_insert} students...'})
@@ -946,10 +1220,19 @@ def bulk_import():
                         db.session.bulk_save_objects(chunk)
                         db.session.commit()
                         imported += len(chunk)
-                    except Exception as e:
+                    except Exception:
                         db.session.rollback()
-                        skipped += len(chunk)
-                        skipped_list.append(f"Chunk error: {str(e)}")
+                        # Rows were already validated above — just retry each one on its own
+                        # so a single conflicting row doesn't drop the whole chunk
+                        for student in chunk:
+                            try:
+                                db.session.add(student)
+                                db.session.commit()
+                                imported += 1
+                            except Exception as e:
+                                db.session.rollback()
+                                skipped += 1
+                                skipped_list.append(f"{student.name} ({student.student_id}) - {str(e)}")
                     
                     pct = 40 + int((imported / max(total_to_insert, 1)) * 55)
                     progress_q.put({'phase': 'importing', 'pct': pct, 'msg': f'Imported {imported}/{total_to_insert}...'})
@@ -1058,8 +1341,9 @@ def manage_questions(exam_name):
             question.correct_answer = request.form.get('correct_answer')
         db.session.add(question)
         db.session.commit()
+        invalidate_exam_questions(exam_name)
         return redirect(url_for('manage_questions', exam_name=exam_name))
-    questions = Question.query.filter_by(exam_name=exam_name).order_by(Question.order).all()
+    questions = get_exam_questions(exam_name)
     return render_template('manage_questions.html', exam_name=exam_name, questions=questions, flask_session=flask_session)
 
 @app.route('/delete_question/<int:question_id>', methods=['POST'])
@@ -1067,8 +1351,10 @@ def manage_questions(exam_name):
 def delete_question(question_id):
     question = Question.query.get(question_id)
     if question:
+        exam_name = question.exam_name
         db.session.delete(question)
         db.session.commit()
+        invalidate_exam_questions(exam_name)
     return jsonify({'success': True})
 
 @app.route('/view_answers/<int:session_id>')
@@ -1078,30 +1364,41 @@ def view_answers(session_id):
     if not session:
         return "Session not found", 404
     results = auto_grader.get_session_results(session_id)
-    questions = Question.query.filter_by(exam_name=session.exam_name).order_by(Question.order).all()
-    answers = {a.question_id: a for a in Answer.query.filter_by(session_id=session_id).all()}
+    questions = get_exam_questions(session.exam_name)
+    answers = {a.question_id: a for a in db.session.execute(
+        select(Answer).where(Answer.session_id == session_id)).scalars()}
     needs_grading = any(q.question_type == 'essay' and answers.get(q.id) and not answers[q.id].graded_at for q in questions)
     return render_template('view_answers.html', session=session, questions=questions,
                          answers=answers, results=results, needs_grading=needs_grading,
                          flask_session=flask_session)
 
+def _update_session_total(session_id):
+    """Re-sum points_earned into ExamSession.total_score in one UPDATE.
+
+    The SUM runs inside the UPDATE, so concurrent graders cannot overwrite each
+    other's changes and a stale total is corrected on the next grade.
+    """
+    total = (select(func.coalesce(func.sum(Answer.points_earned), 0))
+             .where(Answer.session_id == session_id).scalar_subquery())
+    db.session.execute(update(ExamSession).where(ExamSession.id == session_id).values(total_score=total))
+
 @app.route('/grade_essay', methods=['POST'])
 @login_required('invigilator')
 def grade_essay():
     answer_id = request.json.get('answer_id')
     points = int(request.json.get('points'))
     feedback = request.json.get('feedback', '')
-    answer = Answer.query.get(answer_id)
+    answer = db.session.get(Answer, answer_id)
     if not answer:
         return jsonify({'success': False, 'message': 'Answer not found'})
     answer.points_earned = points
     answer.grading_feedback = feedback
     answer.graded_by = flask_session['user_id']
     answer.graded_at = datetime.utcnow()
-    session = ExamSession.query.get(answer.session_id)
-    all_answers = Answer.query.filter_by(session_id=answer.session_id).all()
-    session.total_score = sum(a.points_earned for a in all_answers)
+    db.session.flush()
+    _update_session_total(answer.session_id)
     db.session.commit()
+    session = ExamSession.query.get(answer.session_id)
     return jsonify({'success': True, 'total_score': session.total_score})
 
 @app.route('/delete_exam/<int:exam_id>', methods=['POST'])
@@ -1119,13 +1416,13 @@ def delete_exam(exam_id):
 @login_required('invigilator')
 def delete_exam_by_name():
     exam_name = request.json.get('exam_name')
-    exams = ExamSession.query.filter_by(exam_name=exam_name, status='scheduled').all()
-    for exam in exams:
-        Answer.query.filter_by(session_id=exam.id).delete()
-        Alert.query.filter_by(session_id=exam.id).delete()
-        db.session.delete(exam)
-    db.session.commit()
-    return jsonify({'success': True, 'count': len(exams)})
+    ids = [sid for (sid,) in db.session.query(ExamSession.id).filter_by(exam_name=exam_name, status='scheduled')]
+    if ids:
+        Answer.query.filter(Answer.session_id.in_(ids)).delete(synchronize_session=False)
+        Alert.query.filter(Alert.session_id.in_(ids)).delete(synchronize_session=False)
+        ExamSession.query.filter(ExamSession.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+    return jsonify({'success': True, 'count': len(ids)})
 
 @app.route('/schedule_exam', methods=['POST'])
 @login_required('invigilator')
@@ -1145,14 +1442,16 @@ def schedule_exam():
         db.session.add(session)
         student_count = 1
     else:
-        students = Student.query.filter_by(cohort=cohort).all()
+        students = db.session.query(Student.id).filter_by(cohort=cohort).all()
         if not students:
             return f"No students found in cohort '{cohort}'", 400
         student_count = len(students)
-        for student in students:
-            session = ExamSession(student_id=student.id, exam_name=exam_name,
-                                  scheduled_start=scheduled_start, duration_minutes=duration_minutes, status='scheduled')
-            db.session.add(session)
+        # One executemany INSERT for the whole cohort instead of N ORM adds
+        db.session.execute(insert(ExamSession), [
+            {'student_id': sid, 'exam_name': exam_name, 'scheduled_start': scheduled_start,
+             'duration_minutes': duration_minutes, 'status': 'scheduled'}
+            for (sid,) in students
+        ])
     db.session.commit()
     inv = Invigilator.query.get(flask_session['user_id'])
     if inv and inv.admin_id:
@@ -1170,17 +1469,22 @@ def schedule_exam():
 @app.route('/live_review')
 @login_required('invigilator')
 def live_review():
-    active_sessions = ExamSession.query.filter_by(status='in_progress').all()
-    recent_alerts = Alert.query.order_by(Alert.timestamp.desc()).limit(50).all()
+    active_sessions = ExamSession.query.options(joinedload(ExamSession.student)).filter_by(status='in_progress').all()
+    recent_alerts = Alert.query.options(joinedload(Alert.session).joinedload(ExamSession.student)).order_by(
+        Alert.timestamp.desc()).limit(50).all()
     return render_template('live_review.html', active_sessions=active_sessions, alerts=recent_alerts, now=datetime.utcnow())
 
 @app.route('/flag_session/<int:session_id>', methods=['POST'])
 @login_required('invigilator')
 def flag_session(session_id):
-    alert = Alert(session_id=session_id, alert_type='manual_flag', severity='high',
-                  description='Session flagged by invigilator for review')
-    db.session.add(alert)
-    db.session.commit()
+    if db.session.get(ExamSession, session_id) is None:
+        return jsonify({'success': False, 'message': 'Session not found'}), 404
+    # Every manual flag is written, synchronously and outside the cooldown
+    alert = alert_system.create_alert(session_id, 'manual_flag', Config.ALERT_HIGH,
+                                      'Session flagged by invigilator for review',
+                                      respect_cooldown=False)
+    if alert is None:
+        return jsonify({'success': False, 'message': 'Could not save flag'}), 500
     return jsonify({'success': True})
 
 @app.errorhandler(404)
@@ -1555,7 +1859,7 @@ def grade_answer():
     points = int(data.get('points_earned', 0))
     feedback = data.get('feedback', '')
     
-    answer = Answer.query.get(answer_id)
+    answer = db.session.get(Answer, answer_id)
     if not answer:
         return jsonify({'success': False, 'message': 'Answer not found'})
     
@@ -1574,12 +1878,13 @@ def grade_answer():
     answer.grading_feedback = feedback
     answer.graded_by = flask_session.get('user_id')
     answer.graded_at = datetime.utcnow()
+    db.session.flush()
     
-    # Recalculate session total score
+    # Update session total score from the answers' points
+    _update_session_total(answer.session_id)
     session = ExamSession.query.get(answer.session_id)
     if session:
-        all_answers = Answer.query.filter_by(session_id=session.id).all()
-        session.total_score = sum(a.points_earned or 0 for a in all_answers)
+        db.session.refresh(session)
         if session.max_score:
             session.percentage = (session.total_score / session.max_score * 100) if session.max_score > 0 else 0
     
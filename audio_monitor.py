@@ -26,9 +26,13 @@ class AudioSessionMonitor:
         self._suspicious_count = 0
         self._is_monitoring = False
 
-        # Rolling window: accumulate audio levels over N seconds before deciding
+        # Rolling window: accumulate audio levels over N seconds before deciding.
+        # Fixed-size ring of float32 levels (~100 audio chunks per window) —
+        # writers only touch one slot + the index, so no lock is needed for it.
         self._window_seconds = window_seconds
-        self._level_buffer = deque(maxlen=100)  # ~100 audio chunks per window
+        self._ring_size = 100
+        self._ring = np.zeros(self._ring_size, dtype=np.float32)
+        self._ring_idx = 0
 
     # ──────────────────────────────────────────────
     # Public API
@@ -67,10 +71,12 @@ class AudioSessionMonitor:
         """
         level = self._calculate_rms(audio_data)
 
-        with self._lock:
-            self._level_buffer.append(level)
+        idx = self._ring_idx
+        self._ring[idx % self._ring_size] = level
+        self._ring_idx = idx + 1
 
-            if level > self.threshold:
+        if level > self.threshold:
+            with self._lock:
                 event = {
                     'timestamp': datetime.utcnow().isoformat(),
                     'level': round(level, 4),
@@ -80,29 +86,30 @@ class AudioSessionMonitor:
                 self._audio_events.append(event)
                 self._suspicious_count += 1
 
-                # Fire callback immediately for real-time alerting
-                if self.alert_callback:
-                    threading.Thread(
-                        target=self.alert_callback,
-                        args=(self.session_id, event),
-                        daemon=True
-                    ).start()
+            # Fire callback immediately for real-time alerting
+            if self.alert_callback:
+                threading.Thread(
+                    target=self.alert_callback,
+                    args=(self.session_id, event),
+                    daemon=True
+                ).start()
 
-                return True, level
+            return True, level
 
         return False, level
 
     def get_status(self):
         """Return a snapshot of current monitoring state. Thread-safe."""
+        levels = self._recent_levels()
+        avg_level = round(float(levels.mean()), 4) if levels.size else 0
+        peak_level = round(float(levels.max()), 4) if levels.size else 0
         with self._lock:
-            recent_levels = list(self._level_buffer)
-            avg_level = round(sum(recent_levels) / len(recent_levels), 4) if recent_levels else 0
             return {
                 'session_id': self.session_id,
                 'is_monitoring': self._is_monitoring,
                 'suspicious_count': self._suspicious_count,
                 'average_level': avg_level,
-                'peak_level': round(max(recent_levels), 4) if recent_levels else 0,
+                'peak_level': peak_level,
                 'recent_events': list(self._audio_events)[-10:]  # Last 10 events
             }
 
@@ -110,6 +117,11 @@ class AudioSessionMonitor:
     # Internal methods
     # ──────────────────────────────────────────────
 
+    def _recent_levels(self):
+        """Copy of the filled part of the level ring (empty until first chunk)."""
+        filled = min(self._ring_idx, self._ring_size)
+        return np.copy(self._ring[:filled])
+
     def _heartbeat_loop(self):
         """
         Background thread: periodically checks if audio levels have
@@ -119,14 +131,13 @@ class AudioSessionMonitor:
         while not self._stop_event.is_set():
             time.sleep(self._window_seconds)
 
-            with self._lock:
-                if not self._level_buffer:
-                    continue
-                levels = list(self._level_buffer)
+            levels = self._recent_levels()
+            if not levels.size:
+                continue
 
             # If more than 40% of recent chunks are above threshold, flag it
-            above_threshold = sum(1 for l in levels if l > self.threshold)
-            ratio = above_threshold / len(levels)
+            above_threshold = int((levels > self.threshold).sum())
+            ratio = above_threshold / levels.size
 
             if ratio > 0.4 and self.alert_callback:
                 event = {
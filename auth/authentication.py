@@ -1,41 +1,176 @@
 import jwt
+import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+import base64
+import calendar
 import hashlib
+import hmac
+import json
 import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from werkzeug.security import check_password_hash, generate_password_hash
+from werkzeug.security import check_password_hash
 from flask import session
 import os
 from config import Config
 
+_PASSWORD_SPECIALS = frozenset("!@#$%^&*()_+-=[]{}|;:,.<>?")
+
+# Byte -> character class (1 upper, 2 lower, 3 digit, 4 special, 0 other) for ASCII passwords
+_CLASS_UPPER, _CLASS_LOWER, _CLASS_DIGIT, _CLASS_SPECIAL = 1, 2, 3, 4
+
+
+def _class_of(byte):
+    c = chr(byte)
+    if 'A' <= c <= 'Z':
+        return _CLASS_UPPER
+    if 'a' <= c <= 'z':
+        return _CLASS_LOWER
+    if '0' <= c <= '9':
+        return _CLASS_DIGIT
+    if c in _PASSWORD_SPECIALS:
+        return _CLASS_SPECIAL
+    return 0
+
+
+_CLASS_TABLE = bytes(_class_of(b) for b in range(256))
+_TOKEN_LIFETIME = timedelta(hours=24)
+_SESSION_KEYS = ('user_id', 'role', 'logged_in')
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def _b64url_decode(segment):
+    return base64.urlsafe_b64decode(segment + b'=' * (-len(segment) % 4))
+
+
+def _jwt_json_default(value):
+    # Same encoding PyJWT uses for datetime claims (seconds since epoch, UTC)
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+# OWASP Argon2id baseline (46 MiB, t=2, p=1) unless overridden in Config
+_ARGON2 = PasswordHasher(
+    time_cost=Config.ARGON2_TIME_COST,
+    memory_cost=Config.ARGON2_MEMORY_KIB,
+    parallelism=Config.ARGON2_PARALLELISM,
+)
+
+# Config already resolved SECRET_KEY from the environment at import; encode it once
+_SECRET_KEY = Config.SECRET_KEY
+_SECRET_KEY_BYTES = _SECRET_KEY.encode()
+
+# The algorithm is fixed, so the header segment is the same for every token
+# (byte-identical to what PyJWT emits for HS256)
+_JWT_HEADER = _b64url(b'{"alg":"HS256","typ":"JWT"}')
+
 class PasswordManager:
+    # argon2-cffi and bcrypt both release the GIL while hashing, so these threads
+    # run in parallel and keep the cost off the request / event-loop thread
+    _pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix='password-hash')
+    
+    @staticmethod
+    def _encode(password):
+        # bcrypt only looks at the first 72 bytes (newer releases raise instead
+        # of truncating), so cut explicitly to keep long passphrases working
+        return password.encode('utf-8')[:72]
+    
     @staticmethod
     def hash_password(password):
-        """Hash a password with a random salt."""
-        return generate_password_hash(password)
+        """Hash a password with Argon2id; the encoded string carries salt and parameters."""
+        return _ARGON2.hash(password)
     
     @staticmethod
     def verify_password(hashed_password, password):
-        """Verify a password against its hash."""
+        """Verify a password against its hash (Argon2id, legacy bcrypt, or werkzeug PBKDF2)."""
+        if hashed_password.startswith('$argon2'):
+            try:
+                return _ARGON2.verify(hashed_password, password)
+            except (VerificationError, InvalidHashError):
+                return False
+        if hashed_password.startswith('$2'):
+            return bcrypt.checkpw(PasswordManager._encode(password), hashed_password.encode('ascii'))
         return check_password_hash(hashed_password, password)
     
+    @classmethod
+    def hash_password_async(cls, password):
+        """Hash a password on the hashing pool; returns a Future."""
+        return cls._pool.submit(cls.hash_password, password)
+    
+    @classmethod
+    def verify_password_async(cls, hashed_password, password):
+        """Verify a password on the hashing pool; returns a Future."""
+        return cls._pool.submit(cls.verify_password, hashed_password, password)
+    
+    @staticmethod
+    def needs_rehash(hashed_password):
+        """True for bcrypt / werkzeug hashes or Argon2 hashes with other parameters."""
+        if not hashed_password.startswith('$argon2'):
+            return True
+        try:
+            return _ARGON2.check_needs_rehash(hashed_password)
+        except InvalidHashError:
+            return True
+    
+    @staticmethod
+    def check_cost(logger):
+        """Time one Argon2 verify at startup and warn if it is under the target latency."""
+        sample = PasswordManager.hash_password('calibration')
+        start = time.perf_counter()
+        PasswordManager.verify_password(sample, 'calibration')
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms < Config.PASSWORD_HASH_TARGET_MS:
+            logger.warning(f'Argon2 verify took {elapsed_ms:.0f}ms with t={Config.ARGON2_TIME_COST}, '
+                           f'm={Config.ARGON2_MEMORY_KIB}KiB (target {Config.PASSWORD_HASH_TARGET_MS}ms) '
+                           f'- consider raising ARGON2_TIME_COST')
+        return elapsed_ms
+    
     @staticmethod
     def validate_password_strength(password):
         """Validate password strength."""
         errors = []
         
+        if password.isascii():
+            # One C-level translate classifies every byte; no Python loop
+            got = set(password.encode('ascii').translate(_CLASS_TABLE))
+            has_upper = _CLASS_UPPER in got
+            has_lower = _CLASS_LOWER in got
+            has_digit = _CLASS_DIGIT in got
+            has_special = _CLASS_SPECIAL in got
+        else:
+            # Non-ASCII letters/digits still count (str.isupper etc. are Unicode-aware)
+            has_upper = has_lower = has_digit = has_special = False
+            for c in password:
+                if c.isupper():
+                    has_upper = True
+                elif c.islower():
+                    has_lower = True
+                elif c.isdigit():
+                    has_digit = True
+                elif c in _PASSWORD_SPECIALS:
+                    has_special = True
+        
         if len(password) < 8:
             errors.append("Password must be at least 8 characters long")
         
-        if not any(c.isupper() for c in password):
+        if not has_upper:
             errors.append("Password must contain at least one uppercase letter")
         
-        if not any(c.islower() for c in password):
+        if not has_lower:
             errors.append("Password must contain at least one lowercase letter")
         
-        if not any(c.isdigit() for c in password):
+        if not has_digit:
             errors.append("Password must contain at least one digit")
         
-        if not any(c in "!@#$%^&*()_+-=[]{}|;:,.<>?" for c in password):
+        if not has_special:
             errors.append("Password must contain at least one special character")
         
         return len(errors) == 0, errors
@@ -44,9 +179,7 @@ class SessionManager:
     @staticmethod
     def create_session(user_id, role, remember_me=False):
         """Create a user session."""
-        session['user_id'] = user_id
-        session['role'] = role
-        session['logged_in'] = True
+        session.update({'user_id': user_id, 'role': role, 'logged_in': True})
         
         if remember_me:
             # Extend session lifetime if remember_me is True
@@ -55,48 +188,118 @@ class SessionManager:
     @staticmethod
     def destroy_session():
         """Destroy the current session."""
-        session.pop('user_id', None)
-        session.pop('role', None)
-        session.pop('logged_in', None)
+        # Targeted pops rather than session.clear(): the same cookie also carries
+        # the CSRF token and the app's own login keys
+        for key in _SESSION_KEYS:
+            session.pop(key, None)
 
 class AuthenticationManager:
-    def __init__(self):
-        self.secret_key = os.environ.get('SECRET_KEY') or Config.SECRET_KEY
+    def __init__(self, verify_cache_size=10000, verify_cache_ttl=5):
+        self.secret_key = _SECRET_KEY
+        self.secret_key_bytes = _SECRET_KEY_BYTES
+        
+        # Short-lived cache of successfully verified tokens:
+        # blake2b(token) -> (payload, cached_until). Failures are never cached.
+        self._verify_cache = OrderedDict()
+        self._verify_cache_size = verify_cache_size
+        self._verify_cache_ttl = verify_cache_ttl
+        self._verify_cache_lock = threading.Lock()
+    
+    def _sign(self, signing_input):
+        # One-shot hmac.digest runs entirely in OpenSSL (SHA-NI where available)
+        # without building a Python HMAC object per call
+        return hmac.digest(self.secret_key_bytes, signing_input, 'sha256')
+    
+    def _encode(self, payload):
+        """HS256 encode with the precomputed header; only the payload is serialized."""
+        body = json.dumps(payload, separators=(',', ':'), default=_jwt_json_default).encode()
+        signing_input = _JWT_HEADER + b'.' + _b64url(body)
+        return (signing_input + b'.' + _b64url(self._sign(signing_input))).decode('ascii')
+    
+    def _decode(self, token):
+        """Verify an HS256 token; returns the payload, or None if invalid or expired."""
+        try:
+            header, body, signature = token.encode('ascii').split(b'.')
+        except (UnicodeEncodeError, ValueError):
+            return None
+        
+        if header != _JWT_HEADER:
+            # Not one of ours byte-for-byte (e.g. different header key order); let PyJWT decide
+            try:
+                return jwt.decode(token, self.secret_key, algorithms=['HS256'])
+            except jwt.InvalidTokenError:
+                return None
+        
+        try:
+            expected = self._sign(header + b'.' + body)
+            if not hmac.compare_digest(expected, _b64url_decode(signature)):
+                return None
+            payload = json.loads(_b64url_decode(body))
+        except (ValueError, TypeError):
+            return None
+        if not isinstance(payload, dict):
+            return None
+        
+        exp = payload.get('exp')
+        if exp is not None and (not isinstance(exp, (int, float)) or exp <= time.time()):
+            return None
+        return payload
     
     def generate_token(self, user_id, role, additional_claims=None):
         """Generate a JWT token."""
+        now = datetime.utcnow()
         payload = {
             'user_id': user_id,
             'role': role,
-            'exp': datetime.utcnow() + timedelta(hours=24),  # Token expires in 24 hours
-            'iat': datetime.utcnow()
+            'exp': now + _TOKEN_LIFETIME,  # Token expires in 24 hours
+            'iat': now
         }
         
         if additional_claims:
             payload.update(additional_claims)
         
-        return jwt.encode(payload, self.secret_key, algorithm='HS256')
+        return self._encode(payload)
     
     def verify_token(self, token):
         """Verify a JWT token."""
-        try:
-            payload = jwt.decode(token, self.secret_key, algorithms=['HS256'])
-            return payload
-        except jwt.ExpiredSignatureError:
-            return None
-        except jwt.InvalidTokenError:
+        key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        now = time.time()
+        
+        with self._verify_cache_lock:
+            cached = self._verify_cache.get(key)
+            if cached is not None:
+                if cached[1] > now:
+                    self._verify_cache.move_to_end(key)
+                    return dict(cached[0])
+                del self._verify_cache[key]
+        
+        payload = self._decode(token)
+        if payload is None:
             return None
+        
+        cached_until = min(payload.get('exp', now), now + self._verify_cache_ttl)
+        with self._verify_cache_lock:
+            self._verify_cache[key] = (payload, cached_until)
+            self._verify_cache.move_to_end(key)
+            while len(self._verify_cache) > self._verify_cache_size:
+                self._verify_cache.popitem(last=False)
+        return dict(payload)
     
     def refresh_token(self, token):
         """Refresh an existing token."""
         payload = self.verify_token(token)
         if payload:
             # Generate a new token with extended expiration
+            now = datetime.utcnow()
             new_payload = {
                 'user_id': payload['user_id'],
                 'role': payload['role'],
-                'exp': datetime.utcnow() + timedelta(hours=24),
-                'iat': datetime.utcnow()
+                'exp': now + _TOKEN_LIFETIME,
+                'iat': now
             }
-            return jwt.encode(new_payload, self.secret_key, algorithm='HS256')
-        return None
\ No newline at end of file
+            return self._encode(new_payload)
+        return None
+
+
+# Shared instance so every importer uses the same verify cache
+auth_manager = AuthenticationManager()
@@ -1,27 +1,71 @@
 import json
+import time
+from functools import lru_cache
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import joinedload
 from database import db, Answer, Question, ExamSession
 
+# Bumped whenever questions are added/removed so cached max scores are dropped.
+# The cache key also carries a 60s time bucket, so other worker processes that
+# never see the bump still pick up changes within a minute.
+_question_version = 0
+MAX_SCORE_CACHE_SECONDS = 60
+
+
+@lru_cache(maxsize=256)
+def _exam_max_score(exam_name, version, time_bucket):
+    return db.session.query(db.func.coalesce(db.func.sum(Question.points), 0)).filter(
+        Question.exam_name == exam_name).scalar()
+
+
 class AutoGrader:
     @staticmethod
-    def grade_answer(answer_id):
-        """Grade a single answer (MCQ only)"""
-        answer = Answer.query.get(answer_id)
-        if not answer:
-            return None
-        
-        question = answer.question
-        
+    def _compute_grade(answer, question):
+        """Work out the grade for a loaded answer without touching the DB session"""
         # Only auto-grade multiple choice
         if question.question_type == 'multiple_choice':
-            is_correct = answer.answer_text.strip().upper() == question.correct_answer.strip().upper()
-            answer.is_correct = is_correct
-            answer.points_earned = question.points if is_correct else 0
-            db.session.commit()
-            return {'is_correct': is_correct, 'points_earned': answer.points_earned}
+            is_correct = answer.answer_text.strip().upper() == question.correct_answer_norm
+            return {'is_correct': is_correct, 'points_earned': question.points if is_correct else 0}
         
         # Essay questions need manual grading
         return {'is_correct': None, 'points_earned': 0, 'needs_manual_grading': True}
     
+    @staticmethod
+    def _apply_grade(answer, result):
+        """Copy an auto-grade result onto the answer (manual-grading results are left alone)"""
+        if not result.get('needs_manual_grading'):
+            answer.is_correct = result['is_correct']
+            answer.points_earned = result['points_earned']
+    
+    @staticmethod
+    def grade_answer(answer_id):
+        """Grade a single answer (MCQ only)"""
+        answer = db.session.get(Answer, answer_id)
+        if not answer:
+            return None
+        
+        result = AutoGrader._compute_grade(answer, answer.question)
+        if not result.get('needs_manual_grading'):
+            AutoGrader._apply_grade(answer, result)
+            # Inside a caller's SAVEPOINT (db.session.begin_nested()) just flush, so
+            # grading many answers costs one COMMIT from the caller instead of one each
+            if db.session.in_nested_transaction():
+                db.session.flush()
+            else:
+                db.session.commit()
+        return result
+    
+    @staticmethod
+    def exam_max_score(exam_name):
+        """Total points available in an exam (SQL SUM, cached per exam name)"""
+        return _exam_max_score(exam_name, _question_version, int(time.monotonic() // MAX_SCORE_CACHE_SECONDS))
+    
+    @staticmethod
+    def invalidate_exam_cache():
+        """Call after adding/removing questions so max scores are recomputed"""
+        global _question_version
+        _question_version += 1
+    
     @staticmethod
     def grade_session(session_id):
         """Grade all answers in a session and calculate total score"""
@@ -29,25 +73,27 @@ class AutoGrader:
         if not session:
             return None
         
-        # Get all questions for this exam
-        questions = Question.query.filter_by(exam_name=session.exam_name).all()
-        max_score = sum(q.points for q in questions)
+        max_score = AutoGrader.exam_max_score(session.exam_name)
         
-        # Get all answers for this session
-        answers = Answer.query.filter_by(session_id=session_id).all()
+        # Grade every MCQ answer in one set-based UPDATE joined against question
+        is_mcq = Question.question_type == 'multiple_choice'
+        is_correct = func.upper(func.trim(func.coalesce(Answer.answer_text, ''))) == Question.correct_answer_norm
+        db.session.execute(
+            update(Answer)
+            .where(Answer.session_id == session_id, Answer.question_id == Question.id, is_mcq)
+            .values(is_correct=is_correct, points_earned=case((is_correct, Question.points), else_=0))
+            .execution_options(synchronize_session=False)
+        )
         
-        total_score = 0
-        graded_count = 0
-        needs_manual = 0
-        
-        for answer in answers:
-            result = AutoGrader.grade_answer(answer.id)
-            if result:
-                if result.get('needs_manual_grading'):
-                    needs_manual += 1
-                else:
-                    total_score += result['points_earned']
-                    graded_count += 1
+        # Totals in the same transaction, straight off answer (indexed on session_id):
+        # every awarded point, including essays already marked by hand, plus the
+        # answers still waiting for a manual grade
+        total_score, answer_count, needs_manual = db.session.query(
+            func.coalesce(func.sum(Answer.points_earned), 0),
+            func.count(Answer.id),
+            func.coalesce(func.sum(case((Answer.is_correct.is_(None), 1), else_=0)), 0),
+        ).filter(Answer.session_id == session_id).one()
+        graded_count = answer_count - needs_manual
         
         # Update session scores
         session.total_score = total_score
@@ -65,11 +111,11 @@ class AutoGrader:
     @staticmethod
     def get_session_results(session_id):
         """Get detailed results for a session"""
-        session = ExamSession.query.get(session_id)
+        session = ExamSession.query.options(joinedload(ExamSession.student)).get(session_id)
         if not session:
             return None
         
-        answers = Answer.query.filter_by(session_id=session_id).all()
+        answers = Answer.query.options(joinedload(Answer.question)).filter_by(session_id=session_id).all()
         
         results = []
         for answer in answers:
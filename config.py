@@ -1,12 +1,47 @@
 import os
 from datetime import timedelta
 import logging
+import orjson
 from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+
+def _json_serializer(value):
+    # JSON columns (e.g. AuditLog.details) go through orjson instead of stdlib json;
+    # OPT_NON_STR_KEYS keeps stdlib's handling of int dict keys
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _engine_options(database_uri):
+    """
+    QueuePool settings shared by every config. SQLite file databases get
+    connect_args so pooled connections can be handed between request threads
+    and wait on WAL write locks instead of failing immediately.
+    """
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        # Compiled-SQL LRU; select() statements executed via session.execute() are
+        # keyed on their structure, so hot lookups skip recompilation
+        'query_cache_size': int(os.environ.get('DB_QUERY_CACHE_SIZE', 1200)),
+        'json_serializer': _json_serializer,
+        'json_deserializer': orjson.loads,
+        # No pool_pre_ping: app.py pings on checkout only when a connection has
+        # been idle longer than DB_PING_INTERVAL; pool_recycle remains the backstop
+    }
+    if database_uri and database_uri.startswith('sqlite'):
+        options['connect_args'] = {
+            'check_same_thread': False,
+            'timeout': int(os.environ.get('DB_SQLITE_TIMEOUT', 30)),
+        }
+    return options
+
+
 class Config:
     # Secret key for sessions and CSRF protection
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
@@ -15,14 +50,11 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///ai_invigilator.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
-    # PostgreSQL-specific connection pool settings
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
-        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
-        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
-        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
-        'pool_pre_ping': True,
-    }
+    # Connection pool settings
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # Seconds a pooled connection may sit idle before it is pinged on checkout
+    DB_PING_INTERVAL = int(os.environ.get('DB_PING_INTERVAL', 60))
 
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(hours=1)
@@ -33,6 +65,10 @@ class Config:
     # Rate limiting
     RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL') or 'memory://'
 
+    # Login lookup cache (disabled when unset or the redis package is missing)
+    REDIS_URL = os.environ.get('REDIS_URL')
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 300)
+
     # Email configuration
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'smtp.gmail.com'
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
@@ -44,6 +80,17 @@ class Config:
     # Security settings
     SECURITY_PASSWORD_SALT = os.environ.get('SECURITY_PASSWORD_SALT') or 'dev-salt-change-in-production'
 
+    # Fernet-format key for encryption.py; the module refuses to import without it
+    ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY')
+
+    # Argon2id parameters for PasswordManager (OWASP baseline: 46 MiB, t=2, p=1).
+    # Memory is per concurrent hash, so size workers with gunicorn.conf.py in mind;
+    # raise the time cost until one verify takes roughly PASSWORD_HASH_TARGET_MS
+    ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+    ARGON2_MEMORY_KIB = int(os.environ.get('ARGON2_MEMORY_KIB', 47104))
+    ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+    PASSWORD_HASH_TARGET_MS = int(os.environ.get('PASSWORD_HASH_TARGET_MS', 100))
+
     # Tab switch threshold
     TAB_SWITCH_THRESHOLD = int(os.environ.get('TAB_SWITCH_THRESHOLD') or 3)
     
@@ -65,10 +112,21 @@ class Config:
     # File paths
     STUDENT_PHOTOS_PATH = os.environ.get('STUDENT_PHOTOS_PATH') or 'student_photos'
 
+    # Snapshot serving behind a reverse proxy. With USE_X_ACCEL on, /get_snapshot
+    # returns an X-Accel-Redirect to SNAPSHOT_ACCEL_PREFIX and nginx serves the file,
+    # e.g.  location /_snapshots/ { internal; alias /app/static/snapshots/; }
+    # (Apache: set USE_X_SENDFILE instead — Flask's send_file honours it.)
+    USE_X_ACCEL = os.environ.get('USE_X_ACCEL', 'false').lower() == 'true'
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'
+    SNAPSHOT_ACCEL_PREFIX = os.environ.get('SNAPSHOT_ACCEL_PREFIX', '/_snapshots/')
+    # Largest webcam snapshot /upload_snapshot accepts (413 above this)
+    SNAPSHOT_MAX_BYTES = int(os.environ.get('SNAPSHOT_MAX_BYTES') or 2 * 1024 * 1024)
+
     # SMS Configuration (Africa's Talking)
     AFRICASTALKING_API_KEY = os.environ.get('AFRICASTALKING_API_KEY')
     AFRICASTALKING_USERNAME = os.environ.get('AFRICASTALKING_USERNAME', 'sandbox')
     AFRICASTALKING_SENDER_ID = os.environ.get('AFRICASTALKING_SENDER_ID', 'AI_INVIGILATOR')
+    AFRICASTALKING_MAX_QPS = float(os.environ.get('AFRICASTALKING_MAX_QPS', 10))
 
     @staticmethod
     def init_app(app):
@@ -114,13 +172,7 @@ class ProductionConfig(Config):
     SESSION_COOKIE_SAMESITE = 'Lax'
     
     # Production-specific pool settings
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
-        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
-        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
-        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
-        'pool_pre_ping': True,
-    }
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
     
     @staticmethod
     def init_app(app):
@@ -1,4 +1,7 @@
+import orjson
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import insert
+from sqlalchemy.orm import validates
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -132,6 +135,7 @@ class Question(db.Model):
     question_type = db.Column(db.String(20), nullable=False)  # 'multiple_choice', 'essay', 'code'
     options = db.Column(db.Text)  # JSON string for multiple choice options
     correct_answer = db.Column(db.String(10))  # For multiple choice (A, B, C, D)
+    correct_answer_norm = db.Column(db.String(10))  # correct_answer stripped/uppercased, kept in sync below
     points = db.Column(db.Integer, default=1)
     order = db.Column(db.Integer)
     programming_language = db.Column(db.String(50))  # python, java, cpp, javascript, etc.
@@ -139,11 +143,25 @@ class Question(db.Model):
     reference_image = db.Column(db.Text)  # Base64 image for graph questions
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    @property
+    def parsed_options(self):
+        # MCQ options / graph config as a dict; orjson decodes these small payloads several times faster
+        return orjson.loads(self.options) if self.options else {}
+
+    @validates('correct_answer')
+    def _normalize_correct_answer(self, key, value):
+        # Normalize once at write time so grading only normalizes the student's side
+        self.correct_answer_norm = value.strip().upper() if value is not None else None
+        return value
+
 class Answer(db.Model):
+    # PERF: (session_id, question_id) serves the joined grading UPDATE and per-question lookups within a session
+    __table_args__ = (db.Index('ix_answer_session_question', 'session_id', 'question_id'),)
     id = db.Column(db.Integer, primary_key=True)
     # PERF: index=True speeds up per-session answer retrieval
     session_id = db.Column(db.Integer, db.ForeignKey('exam_session.id'), nullable=False, index=True)
-    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
+    # PERF: index=True speeds up answer lookups by question (stats, deleting a question)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False, index=True)
     answer_text = db.Column(db.Text)
     is_correct = db.Column(db.Boolean)  # Auto-graded for MCQ
     points_earned = db.Column(db.Integer, default=0)  # Points for this answer
@@ -153,6 +171,19 @@ class Answer(db.Model):
     graded_at = db.Column(db.DateTime, nullable=True)
     question = db.relationship('Question', backref='answers')
 
+    @classmethod
+    def bulk_create(cls, session_id, answer_pairs):
+        """Insert many (question_id, answer_text) pairs in one executemany; returns the new ids (a list, always)."""
+        now = datetime.utcnow()
+        rows = [{'session_id': session_id, 'question_id': question_id, 'answer_text': answer_text, 'submitted_at': now}
+                for question_id, answer_text in answer_pairs]
+        if not rows:
+            return []
+        if db.session.get_bind().dialect.insert_executemany_returning:
+            return db.session.scalars(insert(cls).returning(cls.id), rows).all()
+        # No executemany RETURNING (e.g. older SQLite): insert one at a time to collect ids
+        return [db.session.execute(insert(cls), row).inserted_primary_key[0] for row in rows]
+
 class ActivityLog(db.Model):
     __tablename__ = 'activity_logs'
     id = db.Column(db.Integer, primary_key=True)
@@ -1,12 +1,62 @@
 from database import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash
+from sqlalchemy import Uuid, func, insert, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import joinedload, selectinload
+from auth.authentication import PasswordManager
+import atexit
+import orjson
+import queue
+import threading
+import time
 import uuid
 
-class User(db.Model):
+# AuditLog.log_action only enqueues; one daemon thread writes rows in batches of
+# up to AUDIT_FLUSH_BATCH, or AUDIT_FLUSH_INTERVAL seconds after the first one.
+AUDIT_FLUSH_BATCH = 500
+AUDIT_FLUSH_INTERVAL = 0.25
+AUDIT_QUEUE_SIZE = 10000
+
+# Bound once: to_dict calls the C method directly instead of looking it up per field
+_ISO = datetime.isoformat
+
+# Ids stay plain strings in Python, but are stored as a native 16-byte uuid on
+# PostgreSQL (CHAR(32) hex elsewhere) instead of 36-char VARCHAR
+UUID = Uuid(as_uuid=False)
+
+# created_at/updated_at are filled by the database (CURRENT_TIMESTAMP), so every app
+# node shares one clock; inserts read them back via RETURNING where supported
+
+
+class BulkDictMixin:
+    """
+    Column-tuple serialization for list endpoints: selects only COLUMNS as plain
+    rows (no ORM instances) and leaves datetimes for orjson to encode natively.
+    Per-instance to_dict() stays for single-object responses.
+    """
+    COLUMNS = ()
+    
+    @classmethod
+    def to_dict_bulk(cls, *criteria, order_by=None):
+        stmt = select(*(getattr(cls, name) for name in cls.COLUMNS)).where(*criteria)
+        if order_by is not None:
+            stmt = stmt.order_by(order_by)
+        keys = cls.COLUMNS
+        return [dict(zip(keys, row)) for row in db.session.execute(stmt)]
+    
+    @classmethod
+    def dumps_bulk(cls, *criteria, order_by=None):
+        """JSON bytes for a list response; naive datetimes come out exactly like isoformat()."""
+        return orjson.dumps(cls.to_dict_bulk(*criteria, order_by=order_by))
+
+class User(BulkDictMixin, db.Model):
     __tablename__ = 'users'
+    COLUMNS = (
+        'id', 'email', 'first_name', 'last_name', 'phone', 'role', 'is_active', 'created_at',
+        'updated_at'
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(UUID, primary_key=True, default=lambda: str(uuid.uuid4()))
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     first_name = db.Column(db.String(50), nullable=False)
@@ -14,31 +64,23 @@ class User(db.Model):
     phone = db.Column(db.String(20), nullable=True)
     role = db.Column(db.String(20), nullable=False, default='student')  # student, instructor, admin
     is_active = db.Column(db.Boolean, default=True, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    exam_sessions = db.relationship('ExamSession', backref='user', lazy=True)
-    alerts = db.relationship('Alert', backref='user', lazy=True)
+    exam_sessions = db.relationship('ExamSession', back_populates='user', lazy=True)
+    alerts = db.relationship('Alert', back_populates='user', foreign_keys='Alert.user_id', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
-    
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'email': self.email,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'phone': self.phone,
-            'role': self.role,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        self.password_hash = PasswordManager.hash_password(password)
     
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+    def check_password(self, password):
+        """Verify a password; legacy werkzeug hashes are upgraded in place (caller commits)."""
+        if not PasswordManager.verify_password(self.password_hash, password):
+            return False
+        if PasswordManager.needs_rehash(self.password_hash):
+            self.password_hash = PasswordManager.hash_password(password)
+        return True
     
     def to_dict(self):
         return {
@@ -49,27 +91,39 @@ class User(db.Model):
             'phone': self.phone,
             'role': self.role,
             'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': _ISO(self.created_at) if self.created_at else None,
+            'updated_at': _ISO(self.updated_at) if self.updated_at else None
         }
 
-class Exam(db.Model):
+class Exam(BulkDictMixin, db.Model):
     __tablename__ = 'exams'
+    COLUMNS = (
+        'id', 'name', 'description', 'duration_minutes', 'start_time', 'end_time', 'is_active',
+        'created_by', 'created_at', 'updated_at'
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(UUID, primary_key=True, default=lambda: str(uuid.uuid4()))
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     duration_minutes = db.Column(db.Integer, nullable=False)
     start_time = db.Column(db.DateTime, nullable=True)
     end_time = db.Column(db.DateTime, nullable=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
-    created_by = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_by = db.Column(UUID, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    questions = db.relationship('Question', backref='exam', lazy=True)
-    exam_sessions = db.relationship('ExamSession', backref='exam', lazy=True)
+    questions = db.relationship('Question', back_populates='exam', lazy=True)
+    exam_sessions = db.relationship('ExamSession', back_populates='exam', lazy=True)
+    
+    @classmethod
+    def get_with_questions(cls, exam_id, with_answers=False):
+        """Load an exam and its questions (optionally their answers) in a fixed number of queries."""
+        loader = selectinload(cls.questions)
+        if with_answers:
+            loader = loader.selectinload(Question.answers)
+        return db.session.execute(select(cls).options(loader).where(cls.id == exam_id)).scalar_one_or_none()
     
     def to_dict(self):
         return {
@@ -77,19 +131,24 @@ class Exam(db.Model):
             'name': self.name,
             'description': self.description,
             'duration_minutes': self.duration_minutes,
-            'start_time': self.start_time.isoformat() if self.start_time else None,
-            'end_time': self.end_time.isoformat() if self.end_time else None,
+            'start_time': _ISO(self.start_time) if self.start_time else None,
+            'end_time': _ISO(self.end_time) if self.end_time else None,
             'is_active': self.is_active,
             'created_by': self.created_by,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': _ISO(self.created_at) if self.created_at else None,
+            'updated_at': _ISO(self.updated_at) if self.updated_at else None
         }
 
-class Question(db.Model):
+class Question(BulkDictMixin, db.Model):
     __tablename__ = 'questions'
+    COLUMNS = (
+        'id', 'exam_id', 'question_text', 'question_type', 'question_subtype', 'options',
+        'correct_answer', 'points', 'order', 'allow_calculator', 'programming_language',
+        'created_at', 'updated_at'
+    )
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    exam_id = db.Column(db.String(36), db.ForeignKey('exams.id'), nullable=False)
+    id = db.Column(UUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    exam_id = db.Column(UUID, db.ForeignKey('exams.id'), nullable=False)
     question_text = db.Column(db.Text, nullable=False)
     question_type = db.Column(db.String(20), nullable=False, default='multiple_choice')  # multiple_choice, essay, code, math, equation, graph
     question_subtype = db.Column(db.String(30), nullable=True)  # code_python, code_java, code_cpp, etc.
@@ -99,11 +158,12 @@ class Question(db.Model):
     order = db.Column(db.Integer, nullable=False)
     allow_calculator = db.Column(db.Boolean, default=False, nullable=False)
     programming_language = db.Column(db.String(30), nullable=True)  # python, java, javascript, cpp, sql
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
 
     # Relationships
-    answers = db.relationship('Answer', backref='question', lazy=True)
+    exam = db.relationship('Exam', back_populates='questions')
+    answers = db.relationship('Answer', back_populates='question', lazy=True)
 
     def to_dict(self):
         return {
@@ -118,25 +178,33 @@ class Question(db.Model):
             'order': self.order,
             'allow_calculator': self.allow_calculator,
             'programming_language': self.programming_language,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': _ISO(self.created_at) if self.created_at else None,
+            'updated_at': _ISO(self.updated_at) if self.updated_at else None
         }
 
-class Answer(db.Model):
+class Answer(BulkDictMixin, db.Model):
     __tablename__ = 'answers'
+    COLUMNS = (
+        'id', 'session_id', 'question_id', 'answer_text', 'submitted_at', 'graded_at',
+        'points_earned', 'grading_feedback', 'code_output', 'created_at', 'updated_at'
+    )
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    session_id = db.Column(db.String(36), db.ForeignKey('exam_sessions.id'), nullable=False)
-    question_id = db.Column(db.String(36), db.ForeignKey('questions.id'), nullable=False)
+    id = db.Column(UUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    session_id = db.Column(UUID, db.ForeignKey('exam_sessions.id'), nullable=False)
+    question_id = db.Column(UUID, db.ForeignKey('questions.id'), nullable=False)
     answer_text = db.Column(db.Text, nullable=True)
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     graded_at = db.Column(db.DateTime, nullable=True)
     points_earned = db.Column(db.Float, nullable=True)  # Points earned (0 to question.points)
     grading_feedback = db.Column(db.Text, nullable=True)
-    graded_by = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=True)
+    graded_by = db.Column(UUID, db.ForeignKey('users.id'), nullable=True)
     code_output = db.Column(db.Text, nullable=True)  # Stored output from code execution
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    question = db.relationship('Question', back_populates='answers')
+    exam_session = db.relationship('ExamSession', back_populates='answers')
 
     def to_dict(self):
         return {
@@ -144,21 +212,25 @@ class Answer(db.Model):
             'session_id': self.session_id,
             'question_id': self.question_id,
             'answer_text': self.answer_text,
-            'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None,
-            'graded_at': self.graded_at.isoformat() if self.graded_at else None,
+            'submitted_at': _ISO(self.submitted_at) if self.submitted_at else None,
+            'graded_at': _ISO(self.graded_at) if self.graded_at else None,
             'points_earned': self.points_earned,
             'grading_feedback': self.grading_feedback,
             'code_output': self.code_output,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': _ISO(self.created_at) if self.created_at else None,
+            'updated_at': _ISO(self.updated_at) if self.updated_at else None
         }
 
-class ExamSession(db.Model):
+class ExamSession(BulkDictMixin, db.Model):
     __tablename__ = 'exam_sessions'
+    COLUMNS = (
+        'id', 'user_id', 'exam_id', 'status', 'start_time', 'end_time', 'duration_used',
+        'total_score', 'max_score', 'percentage', 'created_at', 'updated_at'
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    exam_id = db.Column(db.String(36), db.ForeignKey('exams.id'), nullable=False)
+    id = db.Column(UUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(UUID, db.ForeignKey('users.id'), nullable=False)
+    exam_id = db.Column(UUID, db.ForeignKey('exams.id'), nullable=False)
     status = db.Column(db.String(20), nullable=False, default='not_started')  # not_started, in_progress, completed, failed
     start_time = db.Column(db.DateTime, nullable=True)
     end_time = db.Column(db.DateTime, nullable=True)
@@ -166,12 +238,20 @@ class ExamSession(db.Model):
     total_score = db.Column(db.Float, nullable=True)
     max_score = db.Column(db.Float, nullable=True)
     percentage = db.Column(db.Float, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    answers = db.relationship('Answer', backref='exam_session', lazy=True)
-    alerts = db.relationship('Alert', backref='exam_session', lazy=True)
+    user = db.relationship('User', back_populates='exam_sessions')
+    exam = db.relationship('Exam', back_populates='exam_sessions')
+    answers = db.relationship('Answer', back_populates='exam_session', lazy=True)
+    alerts = db.relationship('Alert', back_populates='exam_session', lazy=True)
+    
+    @classmethod
+    def for_dashboard(cls, *criteria):
+        """Sessions with their alerts and user preloaded (no per-row lazy loads while rendering)."""
+        stmt = select(cls).options(selectinload(cls.alerts), joinedload(cls.user)).where(*criteria)
+        return db.session.execute(stmt).scalars().all()
     
     def to_dict(self):
         return {
@@ -179,32 +259,42 @@ class ExamSession(db.Model):
             'user_id': self.user_id,
             'exam_id': self.exam_id,
             'status': self.status,
-            'start_time': self.start_time.isoformat() if self.start_time else None,
-            'end_time': self.end_time.isoformat() if self.end_time else None,
+            'start_time': _ISO(self.start_time) if self.start_time else None,
+            'end_time': _ISO(self.end_time) if self.end_time else None,
             'duration_used': self.duration_used,
             'total_score': self.total_score,
             'max_score': self.max_score,
             'percentage': self.percentage,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': _ISO(self.created_at) if self.created_at else None,
+            'updated_at': _ISO(self.updated_at) if self.updated_at else None
         }
 
-class Alert(db.Model):
+class Alert(BulkDictMixin, db.Model):
     __tablename__ = 'alerts'
+    # PERF: serves "unresolved alerts for a session, newest first" without a scan or sort
+    __table_args__ = (db.Index('ix_alert_session_unresolved_time', 'session_id', 'resolved', 'timestamp'),)
+    COLUMNS = (
+        'id', 'session_id', 'user_id', 'alert_type', 'severity', 'description', 'timestamp',
+        'screenshot_path', 'resolved', 'resolved_by', 'resolved_at', 'created_at', 'updated_at'
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    session_id = db.Column(db.String(36), db.ForeignKey('exam_sessions.id'), nullable=False)
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    id = db.Column(UUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    session_id = db.Column(UUID, db.ForeignKey('exam_sessions.id'), nullable=False, index=True)
+    user_id = db.Column(UUID, db.ForeignKey('users.id'), nullable=False, index=True)
     alert_type = db.Column(db.String(50), nullable=False)  # face_detection, gaze_tracking, tab_switch, audio, phone_usage, help_request
     severity = db.Column(db.String(20), nullable=False, default='medium')  # low, medium, high, critical
     description = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     screenshot_path = db.Column(db.String(255), nullable=True)
-    resolved = db.Column(db.Boolean, default=False, nullable=False)
-    resolved_by = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=True)
+    resolved = db.Column(db.Boolean, default=False, nullable=False, index=True)
+    resolved_by = db.Column(UUID, db.ForeignKey('users.id'), nullable=True)
     resolved_at = db.Column(db.DateTime, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    user = db.relationship('User', back_populates='alerts', foreign_keys=[user_id])
+    exam_session = db.relationship('ExamSession', back_populates='alerts')
     
     def to_dict(self):
         return {
@@ -214,43 +304,132 @@ class Alert(db.Model):
             'alert_type': self.alert_type,
             'severity': self.severity,
             'description': self.description,
-            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'timestamp': _ISO(self.timestamp) if self.timestamp else None,
             'screenshot_path': self.screenshot_path,
             'resolved': self.resolved,
             'resolved_by': self.resolved_by,
-            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'resolved_at': _ISO(self.resolved_at) if self.resolved_at else None,
+            'created_at': _ISO(self.created_at) if self.created_at else None,
+            'updated_at': _ISO(self.updated_at) if self.updated_at else None
         }
 
-class AuditLog(db.Model):
+class AuditLog(BulkDictMixin, db.Model):
     __tablename__ = 'audit_logs'
+    # PERF: serves per-user audit history ordered by time
+    __table_args__ = (db.Index('ix_audit_user_time', 'user_id', 'created_at'),)
+    COLUMNS = (
+        'id', 'user_id', 'action', 'resource_type', 'resource_id', 'ip_address', 'user_agent',
+        'details', 'created_at'
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=True)
-    action = db.Column(db.String(100), nullable=False)  # USER_LOGIN, USER_LOGOUT, EXAM_STARTED, etc.
+    id = db.Column(UUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(UUID, db.ForeignKey('users.id'), nullable=True, index=True)
+    action = db.Column(db.String(100), nullable=False, index=True)  # USER_LOGIN, USER_LOGOUT, EXAM_STARTED, etc.
     resource_type = db.Column(db.String(50), nullable=True)  # User, Exam, Question, etc.
     resource_id = db.Column(db.String(36), nullable=True)
     ip_address = db.Column(db.String(45), nullable=True)  # IPv4/v6 address
     user_agent = db.Column(db.Text, nullable=True)
-    details = db.Column(db.JSON, nullable=True)  # Additional details as JSON
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # JSONB on PostgreSQL: stored pre-parsed and binary, so reads skip re-parsing
+    details = db.Column(db.JSON().with_variant(JSONB(), 'postgresql'), nullable=True)  # Additional details as JSON
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False, index=True)
+    
+    _queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+    _flusher = None
+    _app = None
+    _flusher_lock = threading.Lock()
     
     @classmethod
     def log_action(cls, user_id, action, resource_type=None, resource_id=None, ip_address=None, user_agent=None, details=None):
-        """Create an audit log entry."""
-        log_entry = cls(
-            user_id=user_id,
-            action=action,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            details=details
-        )
-        db.session.add(log_entry)
+        """Queue an audit log entry (written synchronously if the flusher isn't running or the queue is full)."""
+        # id/timestamp are filled in here so the flusher does no per-row work
+        row = {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'action': action,
+            'resource_type': resource_type,
+            'resource_id': resource_id,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'details': details,
+            'created_at': datetime.utcnow()
+        }
+        if cls._flusher is not None:
+            try:
+                cls._queue.put_nowait(row)
+                return row
+            except queue.Full:
+                pass
+        db.session.execute(insert(cls), [row])
         db.session.commit()
-        return log_entry
+        return row
+    
+    @classmethod
+    def start_flusher(cls, app):
+        """Start the daemon thread that drains queued audit rows into the DB."""
+        with cls._flusher_lock:
+            if cls._flusher is not None:
+                return
+            cls._app = app
+            cls._flusher = threading.Thread(target=cls._flush_loop, name='audit-flusher', daemon=True)
+        cls._flusher.start()
+        # Daemon threads die with the interpreter; write whatever is still queued
+        atexit.register(cls.flush)
+    
+    @classmethod
+    def flush(cls):
+        """Synchronously write every row currently queued."""
+        batch = []
+        while True:
+            try:
+                batch.append(cls._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= AUDIT_FLUSH_BATCH:
+                cls._write_batch(batch)
+                batch = []
+        if batch:
+            cls._write_batch(batch)
+    
+    @classmethod
+    def _flush_loop(cls):
+        """Block for the first queued row, then collect a batch and write it."""
+        while True:
+            batch = [cls._queue.get()]
+            deadline = time.monotonic() + AUDIT_FLUSH_INTERVAL
+            
+            while len(batch) < AUDIT_FLUSH_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(cls._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            cls._write_batch(batch)
+    
+    @classmethod
+    def _write_batch(cls, batch):
+        """Insert a batch of audit rows with one executemany + one commit."""
+        with cls._app.app_context():
+            try:
+                db.session.execute(insert(cls), batch)
+                db.session.commit()
+                return
+            except Exception as e:
+                db.session.rollback()
+                print(f"[AuditLog] Batch of {len(batch)} audit rows failed, retrying row by row: {e}")
+            
+            # One bad row (e.g. its user was deleted while queued) must not
+            # take the rest of the batch with it
+            for row in batch:
+                try:
+                    db.session.execute(insert(cls), [row])
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[AuditLog] Dropped audit row ({row.get('action')}) "
+                          f"for user {row.get('user_id')}: {e}")
     
     def to_dict(self):
         return {
@@ -262,5 +441,5 @@ class AuditLog(db.Model):
             'ip_address': self.ip_address,
             'user_agent': self.user_agent,
             'details': self.details,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': _ISO(self.created_at) if self.created_at else None
         }
\ No newline at end of file
@@ -1,31 +1,40 @@
 from flask_mail import Mail, Message
 from flask import current_app, url_for
+from string import Template
 import secrets
 
 mail = Mail()
 
-class EmailService:
-    @staticmethod
-    def send_verification_email(student):
-        token = secrets.token_urlsafe(32)
-        student.verification_token = token
-
-        verify_url = url_for('verify_email', token=token, _external=True)
-
-        msg = Message(
-            'Verify Your Email - AI Invigilator',
-            recipients=[student.email]
-        )
-        msg.body = f'''Hello {student.name},
+VERIFICATION_SUBJECT = 'Verify Your Email - AI Invigilator'
+VERIFICATION_BODY = Template('''Hello $name,
 
 Please verify your email by clicking the link below:
 
-{verify_url}
+$verify_url
 
 This link will expire in 24 hours.
 
 If you didn't register, please ignore this email.
-'''
+''')
+
+# Placeholder routed once through url_for, then swapped for each real token
+_TOKEN_PLACEHOLDER = 'TOKEN_PLACEHOLDER'
+
+
+class EmailService:
+    @staticmethod
+    def _verification_message(student, url_template):
+        token = secrets.token_urlsafe(32)
+        student.verification_token = token
+        msg = Message(VERIFICATION_SUBJECT, recipients=[student.email])
+        msg.body = VERIFICATION_BODY.substitute(
+            name=student.name, verify_url=url_template.replace(_TOKEN_PLACEHOLDER, token))
+        return msg
+
+    @staticmethod
+    def send_verification_email(student):
+        url_template = url_for('verify_email', token=_TOKEN_PLACEHOLDER, _external=True)
+        msg = EmailService._verification_message(student, url_template)
         try:
             mail.send(msg)
             return True
@@ -33,6 +42,24 @@ If you didn't register, please ignore this email.
             print(f"Email error: {e}")
             return False
 
+    @staticmethod
+    def send_bulk_verification(students):
+        """Send verification emails over one SMTP connection; returns the number sent."""
+        url_template = url_for('verify_email', token=_TOKEN_PLACEHOLDER, _external=True)
+        sent = 0
+        try:
+            # One EHLO/STARTTLS/AUTH for the whole batch instead of one per student
+            with mail.connect() as conn:
+                for student in students:
+                    try:
+                        conn.send(EmailService._verification_message(student, url_template))
+                        sent += 1
+                    except Exception as e:
+                        print(f"Email error for {student.email}: {e}")
+        except Exception as e:
+            print(f"Email connection error: {e}")
+        return sent
+
     @staticmethod
     def send_password_reset(invigilator_email, invigilator_name, reset_link):
         """Send password reset email to invigilator"""
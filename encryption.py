@@ -1,57 +1,166 @@
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
 import os
 import base64
 
+# Payload format: 1-byte cipher id + 12-byte nonce + AEAD ciphertext/tag.
+# Anything else is treated as a legacy Fernet token so existing data still decrypts.
+CIPHER_CHACHA20 = b'\x01'
+CIPHER_AESGCM = b'\x02'
+NONCE_SIZE = 12
+
+# Encrypted files are streamed as: magic + cipher id + 8-byte nonce prefix, then
+# frames of 4-byte length + ciphertext. Chunk nonces are prefix + 4-byte counter,
+# and a closing empty frame sealed with FINAL_FRAME_AD detects truncation.
+FILE_MAGIC = b'AIE\x01'
+FILE_CHUNK_SIZE = 64 * 1024
+FILE_NONCE_PREFIX_SIZE = 8
+FINAL_FRAME_AD = b'final'
+TAG_SIZE = 16
+
+# OpenSSL releases the GIL, so one worker encrypts chunk N while the caller reads chunk N+1
+_file_crypto_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='file-crypto')
+
+
+def _has_aes_instructions():
+    """True when the CPU advertises hardware AES (x86 AES-NI / ARMv8 AES)."""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith(('flags', 'Features')):
+                    return 'aes' in line.split(':', 1)[1].split()
+    except OSError:
+        pass
+    return False
+
+
+def _load_key():
+    """ENCRYPTION_KEY as bytes; refuses to start without one rather than inventing a key."""
+    key = Config.ENCRYPTION_KEY
+    if not key:
+        raise RuntimeError(
+            'ENCRYPTION_KEY is not set. Generate one with '
+            '`python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"` '
+            'and add it to your .env file'
+        )
+    return key.encode()
+
+
 class DataEncryption:
     """Encrypt sensitive data before storing"""
-    
-    def __init__(self):
-        # Get or generate encryption key
-        key = os.environ.get('ENCRYPTION_KEY')
-        if not key:
-            key = Fernet.generate_key()
-            print(f"Generated encryption key: {key.decode()}")
-            print("Add this to your .env file as ENCRYPTION_KEY")
-        else:
-            key = key.encode()
-        
+
+    def __init__(self, key):
+        # Fernet stays around only to read data written before the AEAD switch
         self.cipher = Fernet(key)
-    
+
+        # Separate 256-bit AEAD key derived from the same ENCRYPTION_KEY
+        aead_key = HKDF(algorithm=hashes.SHA256(), length=32, salt=None,
+                        info=b'ai-invigilator data encryption').derive(base64.urlsafe_b64decode(key))
+        self.aeads = {CIPHER_CHACHA20: ChaCha20Poly1305(aead_key), CIPHER_AESGCM: AESGCM(aead_key)}
+        # AES-GCM when the CPU has AES instructions, otherwise ChaCha20 (fast in plain SIMD)
+        self.cipher_id = CIPHER_AESGCM if _has_aes_instructions() else CIPHER_CHACHA20
+
+    def _seal(self, data):
+        nonce = os.urandom(NONCE_SIZE)
+        return self.cipher_id + nonce + self.aeads[self.cipher_id].encrypt(nonce, data, None)
+
+    def _open(self, payload):
+        aead = self.aeads.get(payload[:1])
+        if aead is None:
+            return self.cipher.decrypt(payload)
+        nonce = payload[1:1 + NONCE_SIZE]
+        return aead.decrypt(nonce, payload[1 + NONCE_SIZE:], None)
+
     def encrypt(self, data):
         """Encrypt string data"""
         if not data:
             return None
-        return self.cipher.encrypt(data.encode()).decode()
-    
+        # Strings are stored in text columns, so these still need base64
+        return base64.urlsafe_b64encode(self._seal(data.encode())).decode()
+
     def decrypt(self, encrypted_data):
         """Decrypt string data"""
         if not encrypted_data:
             return None
-        return self.cipher.decrypt(encrypted_data.encode()).decode()
-    
+        raw = base64.urlsafe_b64decode(encrypted_data.encode())
+        if raw[:1] not in self.aeads:
+            # Legacy Fernet token
+            return self.cipher.decrypt(encrypted_data.encode()).decode()
+        return self._open(raw).decode()
+
     def encrypt_file(self, filepath):
-        """Encrypt file contents"""
-        with open(filepath, 'rb') as f:
-            data = f.read()
-        
-        encrypted = self.cipher.encrypt(data)
-        
-        with open(filepath + '.enc', 'wb') as f:
-            f.write(encrypted)
-        
+        """Encrypt file contents in 64 KiB frames (memory use is O(chunk), not O(file))"""
+        aead = self.aeads[self.cipher_id]
+        prefix = os.urandom(FILE_NONCE_PREFIX_SIZE)
+        counter = 0
+        pending = None
+
+        with open(filepath, 'rb') as src, open(filepath + '.enc', 'wb') as dst:
+            dst.write(FILE_MAGIC + self.cipher_id + prefix)
+            while True:
+                chunk = src.read(FILE_CHUNK_SIZE)  # overlaps with the in-flight encrypt
+                if pending is not None:
+                    _write_frame(dst, pending.result())
+                if not chunk:
+                    break
+                pending = _file_crypto_pool.submit(aead.encrypt, _chunk_nonce(prefix, counter), chunk, None)
+                counter += 1
+            _write_frame(dst, aead.encrypt(_chunk_nonce(prefix, counter), b'', FINAL_FRAME_AD))
+
         return filepath + '.enc'
-    
+
     def decrypt_file(self, encrypted_filepath, output_path):
         """Decrypt file contents"""
-        with open(encrypted_filepath, 'rb') as f:
-            encrypted_data = f.read()
-        
-        decrypted = self.cipher.decrypt(encrypted_data)
-        
-        with open(output_path, 'wb') as f:
-            f.write(decrypted)
-        
+        with open(encrypted_filepath, 'rb') as src:
+            header = src.read(len(FILE_MAGIC) + 1 + FILE_NONCE_PREFIX_SIZE)
+            if not header.startswith(FILE_MAGIC):
+                # Single-shot AEAD or Fernet file from before streaming
+                decrypted = self._open(header + src.read())
+                with open(output_path, 'wb') as f:
+                    f.write(decrypted)
+                return output_path
+
+            aead = self.aeads[header[len(FILE_MAGIC):len(FILE_MAGIC) + 1]]
+            prefix = header[-FILE_NONCE_PREFIX_SIZE:]
+            try:
+                with open(output_path, 'wb') as dst:
+                    counter = 0
+                    while True:
+                        length = src.read(4)
+                        if len(length) < 4:
+                            raise ValueError('Encrypted file is truncated')
+                        frame = src.read(int.from_bytes(length, 'big'))
+                        nonce = _chunk_nonce(prefix, counter)
+                        if len(frame) == TAG_SIZE:
+                            # Empty closing frame: authenticates end-of-file
+                            aead.decrypt(nonce, frame, FINAL_FRAME_AD)
+                            break
+                        dst.write(aead.decrypt(nonce, frame, None))
+                        counter += 1
+            except Exception:
+                os.remove(output_path)
+                raise
+
         return output_path
 
-# Initialize global encryption instance
-encryption = DataEncryption()
+
+def _chunk_nonce(prefix, counter):
+    return prefix + counter.to_bytes(NONCE_SIZE - FILE_NONCE_PREFIX_SIZE, 'big')
+
+
+def _write_frame(dst, ciphertext):
+    dst.write(len(ciphertext).to_bytes(4, 'big'))
+    dst.write(ciphertext)
+
+# One process-wide cipher: key derivation and cipher setup happen once at import
+_CIPHER = DataEncryption(_load_key())
+encryption = _CIPHER
+
+encrypt = _CIPHER.encrypt
+decrypt = _CIPHER.decrypt
+encrypt_file = _CIPHER.encrypt_file
+decrypt_file = _CIPHER.decrypt_file
@@ -1,3 +1,5 @@
+import os
+from operator import attrgetter
 import cv2
 import numpy as np
 
@@ -36,10 +38,43 @@ GAZE_THRESHOLD = 0.35
 # Minimum eye openness ratio — below this is considered a blink (not a gaze violation)
 BLINK_THRESHOLD = 0.15
 
+# Gaze only changes on human timescales (~100 ms): run the full analysis on every
+# GAZE_DECIMATION-th frame of a stream and reuse the last result in between
+GAZE_DECIMATION = max(1, int(os.environ.get('GAZE_DECIMATION', 3)))
+
+# Landmarks pulled into the per-frame (10, 2) array, as [left eye, right eye] pairs:
+# iris centres, first corner, second corner, eye tops, eye bottoms
+GAZE_LANDMARKS = (
+    LEFT_IRIS_CENTER, RIGHT_IRIS_CENTER,
+    LEFT_EYE_OUTER, RIGHT_EYE_INNER,
+    LEFT_EYE_INNER, RIGHT_EYE_OUTER,
+    LEFT_EYE_TOP, RIGHT_EYE_TOP,
+    LEFT_EYE_BOTTOM, RIGHT_EYE_BOTTOM,
+)
+
+# Row positions within that array
+ROWS_IRIS, ROWS_CORNER_A, ROWS_CORNER_B = slice(0, 2), slice(2, 4), slice(4, 6)
+ROWS_TOP, ROWS_BOTTOM = slice(6, 8), slice(8, 10)
+
+# Reads (x, y) off a landmark in one C call
+_get_xy = attrgetter('x', 'y')
+
 
 class EyeTracker:
-    def __init__(self):
+    # Gather indices, built once for every tracker
+    _IDX = np.array(GAZE_LANDMARKS, dtype=np.intp)
+
+    def __init__(self, decimation=GAZE_DECIMATION, refine_landmarks=True):
         self.looking_away_threshold = GAZE_THRESHOLD
+        self.decimation = decimation
+        # Iris landmarks exist iff FaceMesh runs with refine_landmarks=True (as
+        # FaceDetector does); fixed for the tracker's lifetime, so decided once here
+        self._has_iris = refine_landmarks
+        self._idx = self._IDX.tolist()
+        self._count = 2 * len(self._idx)
+        # stream_id -> [frames seen, last (is_looking, confidence)]; one shared
+        # tracker can serve several sessions without mixing their frame counts
+        self._streams = {}
 
         if not MEDIAPIPE_AVAILABLE:
             # Fallback cascade for basic eye detection
@@ -52,10 +87,12 @@ class EyeTracker:
     # Public API (same signatures as before — app.py needs no changes)
     # ──────────────────────────────────────────────────────────────────────
 
-    def is_looking_at_screen(self, face_landmarks, frame_shape):
+    def is_looking_at_screen(self, face_landmarks, frame_shape, stream_id=None):
         """
         Returns (is_looking: bool, confidence: float).
         face_landmarks is a MediaPipe NormalizedLandmarkList from FaceMesh.
+        Only every `decimation`-th frame per stream_id is analysed; frames in
+        between return the previous result.
         """
         if face_landmarks is None:
             return False, 0.0
@@ -64,8 +101,20 @@ class EyeTracker:
             # Fallback: if we got any landmarks, assume looking forward
             return True, 0.5
 
+        state = self._streams.get(stream_id)
+        if state is None:
+            state = self._streams[stream_id] = [0, None]
+        state[0] += 1
+        if state[1] is not None and state[0] % self.decimation:
+            return state[1]
+
         direction, confidence = self.detect_gaze_direction(face_landmarks, frame_shape)
-        return direction == "looking_forward", confidence
+        state[1] = (direction == "looking_forward", confidence)
+        return state[1]
+
+    def reset_stream(self, stream_id=None):
+        """Forget the frame counter / cached result for a finished stream."""
+        self._streams.pop(stream_id, None)
 
     def detect_gaze_direction(self, face_landmarks, frame_shape):
         """
@@ -80,116 +129,60 @@ class EyeTracker:
         if not MEDIAPIPE_AVAILABLE:
             return "looking_forward", 0.5
 
+        if not self._has_iris:
+            # Fallback: face is detected but no iris data — assume forward
+            return "looking_forward", 0.4
+
         try:
             landmarks = face_landmarks.landmark
-            total = len(landmarks)
-
-            # Check if iris landmarks are available (requires refine_landmarks=True)
-            has_iris = total > LEFT_IRIS_CENTER
-
-            if not has_iris:
-                # Fallback: face is detected but no iris data — assume forward
-                return "looking_forward", 0.4
-
-            # ── Check for blink (eyes closed) ────────────────────────────
-            left_openness = self._eye_openness(landmarks, LEFT_EYE_TOP, LEFT_EYE_BOTTOM,
-                                                LEFT_EYE_OUTER, LEFT_EYE_INNER)
-            right_openness = self._eye_openness(landmarks, RIGHT_EYE_TOP, RIGHT_EYE_BOTTOM,
-                                                 RIGHT_EYE_OUTER, RIGHT_EYE_INNER)
-            avg_openness = (left_openness + right_openness) / 2
-
-            if avg_openness < BLINK_THRESHOLD:
-                return "eyes_closed", 0.9  # Blink — don't flag as looking away
-
-            # ── Horizontal gaze (left/right) ─────────────────────────────
-            left_ratio  = self._iris_horizontal_ratio(landmarks,
-                                                       LEFT_IRIS_CENTER,
-                                                       LEFT_EYE_OUTER,
-                                                       LEFT_EYE_INNER)
-            right_ratio = self._iris_horizontal_ratio(landmarks,
-                                                       RIGHT_IRIS_CENTER,
-                                                       RIGHT_EYE_INNER,   # Note: swapped for right eye
-                                                       RIGHT_EYE_OUTER)
-            avg_h_ratio = (left_ratio + right_ratio) / 2
-
-            # ── Vertical gaze (up/down) ───────────────────────────────────
-            left_v_ratio  = self._iris_vertical_ratio(landmarks,
-                                                       LEFT_IRIS_CENTER,
-                                                       LEFT_EYE_TOP,
-                                                       LEFT_EYE_BOTTOM)
-            right_v_ratio = self._iris_vertical_ratio(landmarks,
-                                                       RIGHT_IRIS_CENTER,
-                                                       RIGHT_EYE_TOP,
-                                                       RIGHT_EYE_BOTTOM)
-            avg_v_ratio = (left_v_ratio + right_v_ratio) / 2
-
-            # ── Classify gaze direction ───────────────────────────────────
-            # Ratios are 0.0–1.0. 0.5 = centre.
-            h_deviation = abs(avg_h_ratio - 0.5)
-            v_deviation = abs(avg_v_ratio - 0.5)
-
-            if h_deviation > self.looking_away_threshold:
-                direction = "looking_left" if avg_h_ratio < 0.5 else "looking_right"
-                confidence = min(1.0, h_deviation * 2)
-                return direction, round(confidence, 3)
-
-            if v_deviation > self.looking_away_threshold:
-                direction = "looking_up" if avg_v_ratio < 0.5 else "looking_down"
-                confidence = min(1.0, v_deviation * 2)
-                return direction, round(confidence, 3)
-
-            # Iris is near centre — student is looking at screen
-            confidence = 1.0 - max(h_deviation, v_deviation) * 2
-            return "looking_forward", round(max(0.0, confidence), 3)
+
+            # One gather per frame: a single protobuf lookup per landmark, (x, y)
+            # read in one attrgetter call, streamed straight into a (10, 2) array
+            pts = np.fromiter(
+                (v for p in map(landmarks.__getitem__, self._idx) for v in _get_xy(p)),
+                dtype=np.float64, count=self._count,
+            ).reshape(-1, 2)
+            return _classify_gaze(pts, self.looking_away_threshold)
 
         except (IndexError, AttributeError) as e:
             # Landmark data incomplete — don't flag as violation
             return "looking_forward", 0.3
 
-    # ──────────────────────────────────────────────────────────────────────
-    # Internal helpers
-    # ──────────────────────────────────────────────────────────────────────
 
-    def _iris_horizontal_ratio(self, landmarks, iris_idx, left_corner_idx, right_corner_idx):
-        """
-        Returns how far the iris is between the left and right eye corners.
-        0.0 = fully left, 0.5 = centre, 1.0 = fully right.
-        """
-        iris_x  = landmarks[iris_idx].x
-        left_x  = landmarks[left_corner_idx].x
-        right_x = landmarks[right_corner_idx].x
+# ─────────────────────────────────────────────────────────────────────────────
+# Gaze kernel — both eyes at once on the (10, 2) GAZE_LANDMARKS array
+# ─────────────────────────────────────────────────────────────────────────────
 
-        eye_width = abs(right_x - left_x)
-        if eye_width < 1e-6:
-            return 0.5  # Avoid division by zero
+def _span_ratio(v, a, b):
+    """Per eye, position of v between a and b: 0.0 at min(a, b), 1.0 at max(a, b), 0.5 if degenerate."""
+    span = np.abs(b - a)
+    ratio = np.divide(v - np.minimum(a, b), span, out=np.full_like(v, 0.5), where=span >= 1e-6)
+    return np.clip(ratio, 0.0, 1.0, out=ratio)
 
-        ratio = (iris_x - min(left_x, right_x)) / eye_width
-        return max(0.0, min(1.0, ratio))
 
-    def _iris_vertical_ratio(self, landmarks, iris_idx, top_idx, bottom_idx):
-        """
-        Returns how far the iris is between the top and bottom of the eye.
-        0.0 = fully up, 0.5 = centre, 1.0 = fully down.
-        """
-        iris_y  = landmarks[iris_idx].y
-        top_y   = landmarks[top_idx].y
-        bot_y   = landmarks[bottom_idx].y
+def _classify_gaze(pts, threshold):
+    iris_x, iris_y = pts[ROWS_IRIS, 0], pts[ROWS_IRIS, 1]
+    corner_a, corner_b = pts[ROWS_CORNER_A, 0], pts[ROWS_CORNER_B, 0]
+    top_y, bot_y = pts[ROWS_TOP, 1], pts[ROWS_BOTTOM, 1]
 
-        eye_height = abs(bot_y - top_y)
-        if eye_height < 1e-6:
-            return 0.5
+    # ── Check for blink (eyes closed): openness = height / width ─────────
+    width = np.abs(corner_b - corner_a)
+    openness = np.divide(np.abs(top_y - bot_y), width, out=np.zeros(2), where=width >= 1e-6)
+    if openness.mean() < BLINK_THRESHOLD:
+        return "eyes_closed", 0.9  # Blink — don't flag as looking away
 
-        ratio = (iris_y - min(top_y, bot_y)) / eye_height
-        return max(0.0, min(1.0, ratio))
+    # ── Horizontal / vertical iris position; 0.5 = centre ────────────────
+    avg_h = float(_span_ratio(iris_x, corner_a, corner_b).mean())
+    avg_v = float(_span_ratio(iris_y, top_y, bot_y).mean())
 
-    def _eye_openness(self, landmarks, top_idx, bottom_idx, outer_idx, inner_idx):
-        """
-        Returns eye openness as a ratio of height/width.
-        Near 0 = closed, ~0.3+ = open.
-        """
-        height = abs(landmarks[top_idx].y - landmarks[bottom_idx].y)
-        width  = abs(landmarks[outer_idx].x - landmarks[inner_idx].x)
+    h_dev = abs(avg_h - 0.5)
+    v_dev = abs(avg_v - 0.5)
+
+    if h_dev > threshold:
+        return ("looking_left" if avg_h < 0.5 else "looking_right"), round(min(1.0, h_dev * 2), 3)
+
+    if v_dev > threshold:
+        return ("looking_up" if avg_v < 0.5 else "looking_down"), round(min(1.0, v_dev * 2), 3)
 
-        if width < 1e-6:
-            return 0.0
-        return height / width
\ No newline at end of file
+    # Iris is near centre — student is looking at screen
+    return "looking_forward", round(max(0.0, 1.0 - max(h_dev, v_dev) * 2), 3)
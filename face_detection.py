@@ -1,3 +1,7 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 import cv2
 import numpy as np
 
@@ -9,9 +13,102 @@ except ImportError:
     MEDIAPIPE_AVAILABLE = False
     print("Warning: MediaPipe not installed. Run: pip install mediapipe")
 
+# Without MediaPipe, prefer OpenCV's built-in YuNet detector (cv2.FaceDetectorYN)
+# running the int8-quantized ONNX model; Haar is the last resort.
+# Model: https://github.com/opencv/opencv_zoo/tree/main/models/face_detection_yunet
+YUNET_MODEL_PATH = os.environ.get('YUNET_MODEL_PATH', os.path.join('models', 'face_detection_yunet_2023mar_int8.onnx'))
+YUNET_INPUT_WIDTH = 320   # frames are downscaled to this width before detection
+YUNET_SCORE_THRESHOLD = 0.6
+
+# MediaPipe Tasks FaceLandmarker bundle. When present, landmarks come from the Tasks
+# API, which can run on the GPU delegate; otherwise the legacy FaceMesh (CPU/XNNPACK).
+# Model: https://ai.google.dev/edge/mediapipe/solutions/vision/face_landmarker
+FACE_LANDMARKER_MODEL_PATH = os.environ.get('FACE_LANDMARKER_MODEL_PATH', os.path.join('models', 'face_landmarker.task'))
+# int8-quantized variant, preferred whenever the CPU (XNNPACK) delegate ends up being used
+FACE_LANDMARKER_INT8_MODEL_PATH = os.environ.get('FACE_LANDMARKER_INT8_MODEL_PATH', os.path.join('models', 'face_landmarker_int8.task'))
+
+# Face Mesh is only re-run when the single detected face has moved (bbox IoU with
+# the last meshed frame drops to MESH_REUSE_IOU) or after MESH_MAX_SKIPS reused frames
+MESH_REUSE_IOU = 0.7
+MESH_MAX_SKIPS = 4
+
+# Bound once: the per-frame paths read these instead of re-resolving cv2 attributes
+_BGR2RGB = cv2.COLOR_BGR2RGB
+_BGR2GRAY = cv2.COLOR_BGR2GRAY
+_INTER_AREA = cv2.INTER_AREA
+_INTER_LINEAR = cv2.INTER_LINEAR
+
+# Motion gate: frames whose 32x32 thumbnail differs from the last analysed frame by
+# less than MOTION_GATE_THRESHOLD grey levels (mean absolute difference) reuse the
+# previous detections/landmarks instead of running any model
+MOTION_GATE_SIZE = (32, 32)
+MOTION_GATE_THRESHOLD = 3.0
+
+
+def _iou(a, b):
+    """Intersection-over-union of two (x, y, w, h) boxes."""
+    ix = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    iy = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    if ix <= 0 or iy <= 0:
+        return 0.0
+    inter = ix * iy
+    return inter / (a[2] * a[3] + b[2] * b[3] - inter)
+
+
+def _load_yunet():
+    if not hasattr(cv2, 'FaceDetectorYN') or not os.path.exists(YUNET_MODEL_PATH):
+        return None
+    try:
+        return cv2.FaceDetectorYN.create(YUNET_MODEL_PATH, "", (YUNET_INPUT_WIDTH, 240), YUNET_SCORE_THRESHOLD)
+    except cv2.error as e:
+        print(f"FaceDetector: could not load YuNet model ({e})")
+        return None
+
+
+def _load_face_landmarker():
+    """
+    FaceLandmarker on the GPU delegate; without a usable GPU, the CPU delegate with
+    the int8 model if present (else the float model). None if unavailable.
+    """
+    try:
+        from mediapipe.tasks.python import BaseOptions
+        from mediapipe.tasks.python.vision import FaceLandmarker, FaceLandmarkerOptions, RunningMode
+    except ImportError:
+        return None
+
+    candidates = [
+        (FACE_LANDMARKER_MODEL_PATH, BaseOptions.Delegate.GPU),
+        (FACE_LANDMARKER_INT8_MODEL_PATH, BaseOptions.Delegate.CPU),
+        (FACE_LANDMARKER_MODEL_PATH, BaseOptions.Delegate.CPU),
+    ]
+    for model_path, delegate in candidates:
+        if not os.path.exists(model_path):
+            continue
+        try:
+            landmarker = FaceLandmarker.create_from_options(FaceLandmarkerOptions(
+                base_options=BaseOptions(model_asset_path=model_path, delegate=delegate),
+                running_mode=RunningMode.VIDEO,
+                num_faces=4,
+                output_face_blendshapes=False,
+                min_face_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            ))
+            print(f"FaceDetector: FaceLandmarker loaded ({os.path.basename(model_path)}, {delegate.name} delegate)")
+            return landmarker
+        except Exception as e:
+            # GPU delegate init fails on headless/unsupported systems; retry on CPU
+            print(f"FaceDetector: FaceLandmarker {delegate.name} delegate unavailable ({e})")
+    return None
+
 
 class FaceDetector:
     def __init__(self):
+        # OpenCV splits detectMultiScale's independent sliding windows (and resize/
+        # cvtColor rows) across its own thread pool; use all but one core, leaving
+        # one for the request threads
+        cv2.setUseOptimized(True)
+        cv2.setNumThreads(max(2, (os.cpu_count() or 2) - 1))
+
         if MEDIAPIPE_AVAILABLE:
             # Face Detection — fast, accurate, works at angles
             # model_selection=0: short range (within 2m) — ideal for exam webcams
@@ -20,24 +117,41 @@ class FaceDetector:
                 model_selection=0,
                 min_detection_confidence=0.6
             )
+            # Bound method cached so the per-frame call skips the attribute chain
+            self._face_detection_process = self._face_detection.process
 
-            # Face Mesh — 468 landmarks for accurate gaze tracking
-            self._mp_face_mesh = mp.solutions.face_mesh
-            self._face_mesh = self._mp_face_mesh.FaceMesh(
-                max_num_faces=4,          # Detect up to 4 faces (catches multiple people)
-                refine_landmarks=True,    # Enables iris landmarks for gaze tracking
-                min_detection_confidence=0.5,
-                min_tracking_confidence=0.5
-            )
+            # Face Mesh — 478 landmarks (incl. iris) for accurate gaze tracking.
+            # Prefer the Tasks FaceLandmarker (GPU-capable); legacy FaceMesh otherwise
+            self._face_landmarker = _load_face_landmarker()
+            self._last_timestamp_ms = 0
+            if self._face_landmarker is None:
+                self._mp_face_mesh = mp.solutions.face_mesh
+                self._face_mesh = self._mp_face_mesh.FaceMesh(
+                    max_num_faces=4,          # Detect up to 4 faces (catches multiple people)
+                    refine_landmarks=True,    # Enables iris landmarks for gaze tracking
+                    min_detection_confidence=0.5,
+                    min_tracking_confidence=0.5
+                )
+                self._face_mesh_process = self._face_mesh.process
 
             self._mp_drawing = mp.solutions.drawing_utils
             print("FaceDetector: MediaPipe loaded successfully")
         else:
-            # Fallback to Haar Cascade if MediaPipe is not installed
-            self._face_cascade = cv2.CascadeClassifier(
-                cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-            )
-            print("FaceDetector: Falling back to Haar Cascade (install MediaPipe for better accuracy)")
+            self._yunet = _load_yunet()
+            self._yunet_size = (YUNET_INPUT_WIDTH, 240)
+            if self._yunet is not None:
+                print("FaceDetector: MediaPipe not installed, using YuNet (int8 ONNX)")
+            else:
+                # Fallback to Haar Cascade if neither MediaPipe nor the YuNet model is available
+                self._face_cascade = cv2.CascadeClassifier(
+                    cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+                )
+                # T-API: with an OpenCL device, UMat inputs run cvtColor and the
+                # cascade on the (integrated) GPU
+                self._use_opencl = cv2.ocl.haveOpenCL()
+                cv2.ocl.setUseOpenCL(self._use_opencl)
+                self._gray_buf = None
+                print("FaceDetector: Falling back to Haar Cascade (install MediaPipe for better accuracy)")
 
         # Hand gesture recognizer (unchanged)
         try:
@@ -48,10 +162,37 @@ class FaceDetector:
             self._hand_gestures_enabled = False
             print("Warning: Hand gesture recognition not available. Install MediaPipe.")
 
+        # MediaPipe's process() releases the GIL, so mesh and hand graphs can run
+        # on these workers while the caller's thread runs face detection
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='face-inference')
+
         # Cache the last face mesh result so EyeTracker can use it
         # without running face mesh twice per frame
         self._last_mesh_results = None
 
+        # RGB copy of the frame currently being analysed, shared by face detection
+        # and face mesh so each frame is colour-converted once
+        self._cached_frame = None
+        self._cached_rgb = None
+        self._cached_detections = None
+        self._rgb_buf = None
+
+        # MediaPipe's models take 128-256 px inputs, so larger frames are shrunk to
+        # this width first; detections and landmarks are normalized, so no rescaling
+        self._inference_width = 640
+
+        # Mesh gating state: landmarks are reused while the face stays put
+        self._mesh_skip_counter = 0
+        self._last_landmarks = None
+        self._last_face_bbox = None
+        self._has_mesh_result = False
+
+        # Motion gate state (see _is_static)
+        self._prev_small = None
+        self._motion_frame = None
+        self._motion_static = False
+        self._last_detections = None
+
     # ──────────────────────────────────────────────────────────────────────
     # Face detection
     # ──────────────────────────────────────────────────────────────────────
@@ -63,31 +204,110 @@ class FaceDetector:
         detections is a list of (x, y, w, h) bounding boxes — same format
         as before so draw_detections() and app.py need no changes.
         """
+        if self._is_static(frame) and self._last_detections is not None:
+            return self._last_detections
+
         if MEDIAPIPE_AVAILABLE:
-            return self._detect_faces_mediapipe(frame)
+            self._last_detections = self._detect_faces_mediapipe(frame)
+        elif self._yunet is not None:
+            self._last_detections = self._detect_faces_yunet(frame)
         else:
-            return self._detect_faces_haar(frame)
+            self._last_detections = self._detect_faces_haar(frame)
+        return self._last_detections
+
+    def _is_static(self, frame):
+        """True when frame is a near-duplicate of the last analysed frame (decided once per frame)."""
+        if frame is self._motion_frame:
+            return self._motion_static
+        small = cv2.resize(frame, MOTION_GATE_SIZE, interpolation=_INTER_AREA).astype(np.int16)
+        static = (self._prev_small is not None and small.shape == self._prev_small.shape
+                  and np.mean(np.abs(small - self._prev_small)) < MOTION_GATE_THRESHOLD)
+        if not static:
+            # Compare against the last frame that was actually analysed, so slow
+            # drift accumulates until it crosses the threshold
+            self._prev_small = small
+        self._motion_frame = frame
+        self._motion_static = static
+        return static
+
+    def _get_rgb(self, frame):
+        """Downscaled BGR→RGB once per frame; later calls with the same frame reuse the buffer."""
+        # Holding a reference to the frame (rather than keying on id()) means the
+        # id can't be recycled by a new frame while the cache entry is alive
+        if frame is not self._cached_frame:
+            h, w = frame.shape[:2]
+            if w > self._inference_width:
+                # Resize before converting so cvtColor also touches fewer pixels
+                small = cv2.resize(frame, (self._inference_width, h * self._inference_width // w),
+                                   interpolation=_INTER_LINEAR)
+            else:
+                small = frame
+            # Convert into one reused buffer instead of allocating W*H*3 bytes per frame
+            rgb = self._rgb_buf
+            if rgb is None or rgb.shape != small.shape:
+                rgb = self._rgb_buf = np.empty_like(small)
+            rgb.flags.writeable = True
+            cv2.cvtColor(small, _BGR2RGB, dst=rgb)
+            # Read-only input lets MediaPipe pass the buffer by reference instead of copying
+            rgb.flags.writeable = False
+            self._cached_frame = frame
+            self._cached_rgb = rgb
+            self._cached_detections = None
+        return self._cached_rgb
 
     def _detect_faces_mediapipe(self, frame):
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self._face_detection.process(rgb)
+        rgb = self._get_rgb(frame)
+        if self._cached_detections is not None:
+            # get_face_landmarks already ran detection on this frame (or vice versa)
+            return self._cached_detections
+        results = self._face_detection_process(rgb)
 
         detections = []
         if results.detections:
             h, w = frame.shape[:2]
-            for detection in results.detections:
-                bbox = detection.location_data.relative_bounding_box
-                # Convert relative coordinates to pixel coordinates
-                x = max(0, int(bbox.xmin * w))
-                y = max(0, int(bbox.ymin * h))
-                bw = min(int(bbox.width * w), w - x)
-                bh = min(int(bbox.height * h), h - y)
+            rel = [(b.xmin, b.ymin, b.width, b.height)
+                   for b in (d.location_data.relative_bounding_box for d in results.detections)]
+            # Convert relative coordinates to pixel coordinates (astype truncates like int())
+            # and clamp the whole batch: origin >= 0, box stays inside the frame
+            boxes = (np.array(rel) * (w, h, w, h)).astype(np.int32)
+            np.maximum(boxes[:, :2], 0, out=boxes[:, :2])
+            np.minimum(boxes[:, 2:], np.array((w, h), dtype=np.int32) - boxes[:, :2], out=boxes[:, 2:])
+            detections = list(map(tuple, boxes.tolist()))
+
+        self._cached_detections = (len(detections), detections)
+        return self._cached_detections
+
+    def _detect_faces_yunet(self, frame):
+        h, w = frame.shape[:2]
+        scale = YUNET_INPUT_WIDTH / w if w > YUNET_INPUT_WIDTH else 1.0
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=_INTER_AREA) if scale < 1.0 else frame
+        size = (small.shape[1], small.shape[0])
+        if size != self._yunet_size:
+            self._yunet.setInputSize(size)
+            self._yunet_size = size
+
+        _, faces = self._yunet.detect(small)
+        detections = []
+        if faces is not None:
+            for face in faces:
+                # Rows are [x, y, w, h, 5 landmark pairs, score] in downscaled pixels
+                x = max(0, int(face[0] / scale))
+                y = max(0, int(face[1] / scale))
+                bw = min(int(face[2] / scale), w - x)
+                bh = min(int(face[3] / scale), h - y)
                 detections.append((x, y, bw, bh))
 
         return len(detections), detections
 
     def _detect_faces_haar(self, frame):
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self._use_opencl:
+            gray = cv2.cvtColor(cv2.UMat(frame), _BGR2GRAY)
+        else:
+            # Reused grey buffer rather than a fresh W*H allocation per frame
+            if self._gray_buf is None or self._gray_buf.shape != frame.shape[:2]:
+                self._gray_buf = np.empty(frame.shape[:2], dtype=frame.dtype)
+            gray = cv2.cvtColor(frame, _BGR2GRAY, dst=self._gray_buf)
+        # Boxes come back as a plain ndarray either way
         faces = self._face_cascade.detectMultiScale(gray, 1.3, 5)
         face_list = list(faces) if len(faces) > 0 else []
         return len(face_list), face_list
@@ -101,20 +321,92 @@ class FaceDetector:
         Returns MediaPipe face mesh results for the first detected face.
         EyeTracker uses this for gaze detection.
         Also caches the result so it's only computed once per frame.
+
+        Like MediaPipe's own hand tracker, the heavy mesh model is skipped while
+        the cheap face detector still sees one face in about the same place:
+        the previous landmarks are returned for up to MESH_MAX_SKIPS frames.
         """
         if not MEDIAPIPE_AVAILABLE:
-            # Fallback: return Haar face regions for basic compatibility
-            _, faces = self._detect_faces_haar(frame)
+            # Fallback: return YuNet/Haar face regions for basic compatibility
+            _, faces = self.detect_faces(frame)
             return faces if len(faces) > 0 else None
 
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self._face_mesh.process(rgb)
-        self._last_mesh_results = results  # Cache for draw_detections
+        if self._has_mesh_result and self._is_static(frame):
+            return self._last_landmarks
+
+        _, faces = self.detect_faces(frame)
+        # Only a single, steady face is safe to track; extra faces always re-run the mesh
+        bbox = faces[0] if len(faces) == 1 else None
+        if (bbox is not None and self._last_landmarks is not None
+                and self._mesh_skip_counter < MESH_MAX_SKIPS
+                and _iou(bbox, self._last_face_bbox) > MESH_REUSE_IOU):
+            self._mesh_skip_counter += 1
+            return self._last_landmarks
+
+        return self._remember_mesh(self._run_mesh(self._get_rgb(frame)), faces)
 
-        if results.multi_face_landmarks:
-            return results.multi_face_landmarks[0]  # Return first face landmarks
+    def _remember_mesh(self, landmarks, faces):
+        """Record a fresh mesh result as the new reference for mesh gating."""
+        self._last_landmarks = landmarks
+        self._has_mesh_result = True
+        self._mesh_skip_counter = 0
+        self._last_face_bbox = faces[0] if len(faces) == 1 else None
+        return landmarks
+
+    def _run_mesh(self, rgb):
+        """First face's landmarks (exposing .landmark like FaceMesh output), or None."""
+        if self._face_landmarker is None:
+            results = self._face_mesh_process(rgb)
+            self._last_mesh_results = results  # Cache for draw_detections
+            return results.multi_face_landmarks[0] if results.multi_face_landmarks else None
+
+        # VIDEO mode tracks across calls and needs strictly increasing timestamps
+        timestamp_ms = max(int(time.monotonic() * 1000), self._last_timestamp_ms + 1)
+        self._last_timestamp_ms = timestamp_ms
+        results = self._face_landmarker.detect_for_video(
+            mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb), timestamp_ms)
+        self._last_mesh_results = results
+        if results.face_landmarks:
+            # Same shape EyeTracker reads from FaceMesh: face_landmarks.landmark[i].x/.y
+            return SimpleNamespace(landmark=results.face_landmarks[0])
         return None
 
+    # ──────────────────────────────────────────────────────────────────────
+    # All detectors for one frame
+    # ──────────────────────────────────────────────────────────────────────
+
+    def process_frame_all(self, frame):
+        """
+        Runs face detection, face landmarks and hand detection on one frame.
+        Returns: {'face_count', 'detections', 'landmarks', 'hands'} — the same
+        values detect_faces(), get_face_landmarks() and detect_hands() give.
+        The MediaPipe graphs run concurrently on the shared RGB buffer.
+        """
+        if not MEDIAPIPE_AVAILABLE:
+            face_count, detections = self.detect_faces(frame)
+            return {'face_count': face_count, 'detections': detections,
+                    'landmarks': self.get_face_landmarks(frame), 'hands': self.detect_hands(frame)}
+
+        if self._is_static(frame) and self._last_detections is not None and self._has_mesh_result:
+            # Motion gate: nothing moved, so only the (stateful) hand tracker runs
+            face_count, detections = self._last_detections
+            return {'face_count': face_count, 'detections': detections,
+                    'landmarks': self._last_landmarks, 'hands': self.detect_hands(frame)}
+
+        rgb = self._get_rgb(frame)
+        hands = self._pool.submit(self.detect_hands, frame)
+        if self._last_landmarks is None or self._mesh_skip_counter >= MESH_MAX_SKIPS:
+            # Mesh gating can't reuse landmarks this frame, so the mesh needn't wait for detection
+            mesh = self._pool.submit(self._run_mesh, rgb)
+            face_count, detections = self.detect_faces(frame)
+            landmarks = self._remember_mesh(mesh.result(), detections)
+        else:
+            face_count, detections = self.detect_faces(frame)
+            landmarks = self.get_face_landmarks(frame)
+
+        return {'face_count': face_count, 'detections': detections,
+                'landmarks': landmarks, 'hands': hands.result()}
+
     # ──────────────────────────────────────────────────────────────────────
     # Hand detection (unchanged — uses existing HandGestureRecognizer)
     # ──────────────────────────────────────────────────────────────────────
@@ -174,6 +466,10 @@ class FaceDetector:
     # ──────────────────────────────────────────────────────────────────────
 
     def close(self):
+        self._pool.shutdown(wait=True)
         if MEDIAPIPE_AVAILABLE:
             self._face_detection.close()
-            self._face_mesh.close()
\ No newline at end of file
+            if self._face_landmarker is not None:
+                self._face_landmarker.close()
+            else:
+                self._face_mesh.close()
\ No newline at end of file
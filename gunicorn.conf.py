@@ -0,0 +1,12 @@
+import os
+
+# One worker by default. The app keeps per-process state that breaks when
+# requests are spread over several workers:
+#   - app.bulk_import_progress (bulk import SSE stream answers "Job not found")
+#   - audio_monitor / screen_monitor sessions (start and end on different workers)
+#   - the Flask-Limiter memory:// storage (each worker counts separately)
+#   - AlertSystem cooldowns and the cached exam questions (invalidated per worker)
+# Scale with threads, or set WEB_CONCURRENCY only once that state is moved to a
+# shared store. Each concurrent login also holds one Argon2id hash
+# (ARGON2_MEMORY_KIB, 46 MiB by default) per worker.
+workers = int(os.environ.get('WEB_CONCURRENCY') or 1)
@@ -1,3 +1,6 @@
+import os
+import time
+from types import SimpleNamespace
 import cv2
 import numpy as np
 
@@ -19,9 +22,66 @@ except ImportError:
     mediapipe_available = False
     print("Warning: MediaPipe not available. Hand gesture recognition will be disabled.")
 
+# int8-quantized MediaPipe Tasks HandLandmarker bundle. When present it replaces the
+# legacy Hands solution and runs on the CPU (XNNPACK) delegate, where int8 kernels
+# do several multiply-accumulates per lane (VNNI / NEON dot-product)
+HAND_LANDMARKER_MODEL_PATH = os.environ.get('HAND_LANDMARKER_MODEL_PATH', os.path.join('models', 'hand_landmarker_int8.task'))
+
+# Bound once for the per-frame conversion
+_BGR2RGB = cv2.COLOR_BGR2RGB
+_INTER_LINEAR = cv2.INTER_LINEAR
+
+# MediaPipe HandLandmark indices (the enum isn't importable without the solutions API)
+WRIST = 0
+THUMB_TIP = 4
+FINGER_TIPS = [4, 8, 12, 16, 20]  # thumb, index, middle, ring, pinky
+
+# mp.solutions.hands.HAND_CONNECTIONS grouped into chains so a whole hand is one
+# cv2.polylines call: the five fingers, then the palm outline back to the wrist
+HAND_POLYLINES = [
+    [0, 1, 2, 3, 4],
+    [5, 6, 7, 8],
+    [9, 10, 11, 12],
+    [13, 14, 15, 16],
+    [17, 18, 19, 20],
+    [0, 5, 9, 13, 17, 0],
+]
+
+
+def _landmarks_to_np(hand_landmarks):
+    """(21, 3) float32 array of x, y, z — the proto stores float32, so this is exact."""
+    return np.fromiter(
+        (v for lm in hand_landmarks.landmark for v in (lm.x, lm.y, lm.z)),
+        dtype=np.float32, count=63
+    ).reshape(21, 3)
+
+
+def _load_hand_landmarker():
+    if not mediapipe_available or not os.path.exists(HAND_LANDMARKER_MODEL_PATH):
+        return None
+    try:
+        from mediapipe.tasks.python import BaseOptions
+        from mediapipe.tasks.python.vision import HandLandmarker, HandLandmarkerOptions, RunningMode
+        return HandLandmarker.create_from_options(HandLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=HAND_LANDMARKER_MODEL_PATH,
+                                     delegate=BaseOptions.Delegate.CPU),
+            running_mode=RunningMode.VIDEO,
+            num_hands=2,
+            min_hand_detection_confidence=0.7,
+            min_tracking_confidence=0.7
+        ))
+    except Exception as e:
+        print(f"HandGestureRecognizer: could not load HandLandmarker ({e})")
+        return None
+
+
 class HandGestureRecognizer:
     def __init__(self):
-        self.use_traditional_api = mediapipe_available and hasattr(mp, 'solutions')
+        self._landmarker = _load_hand_landmarker()
+        self._last_timestamp_ms = 0
+        self.use_traditional_api = (self._landmarker is None and mediapipe_available
+                                    and hasattr(mp, 'solutions'))
+        self.enabled = self._landmarker is not None or self.use_traditional_api
         
         if self.use_traditional_api:
             self.mp_hands = mp.solutions.hands
@@ -32,32 +92,63 @@ class HandGestureRecognizer:
                 min_detection_confidence=0.7,
                 min_tracking_confidence=0.7
             )
+            self._hands_process = self.hands.process
         else:
             # For newer MediaPipe versions, we'll disable hand detection for now
             # as the implementation would be quite different
             self.mp_hands = None
             self.mp_drawing = None
             self.hands = None
-        
-    def detect_phone_usage(self, frame):
+
+        # Hands runs on a ~256 px tensor; shrink big frames first (landmarks are
+        # normalized, so drawing on the full-size frame is unaffected)
+        self._inference_width = 640
+        self._rgb_buf = None
+
+    def _to_rgb(self, frame):
+        h, w = frame.shape[:2]
+        if w > self._inference_width:
+            frame = cv2.resize(frame, (self._inference_width, h * self._inference_width // w),
+                               interpolation=_INTER_LINEAR)
+        # Convert into one reused buffer instead of allocating a new array per frame
+        rgb = self._rgb_buf
+        if rgb is None or rgb.shape != frame.shape:
+            rgb = self._rgb_buf = np.empty_like(frame)
+        rgb.flags.writeable = True
+        cv2.cvtColor(frame, _BGR2RGB, dst=rgb)
+        # Read-only input lets MediaPipe use the buffer without copying it
+        rgb.flags.writeable = False
+        return rgb
+
+    def _run_hands(self, frame):
+        """One Hands inference per frame; both gesture checks classify its results."""
+        if self._landmarker is None:
+            return self._hands_process(self._to_rgb(frame))
+
+        # VIDEO mode tracks across calls and needs strictly increasing timestamps
+        timestamp_ms = max(int(time.monotonic() * 1000), self._last_timestamp_ms + 1)
+        self._last_timestamp_ms = timestamp_ms
+        result = self._landmarker.detect_for_video(
+            mp.Image(image_format=mp.ImageFormat.SRGB, data=self._to_rgb(frame)), timestamp_ms)
+        # Same shape as the solutions output: results.multi_hand_landmarks[i].landmark
+        hands = [SimpleNamespace(landmark=hand) for hand in result.hand_landmarks]
+        return SimpleNamespace(multi_hand_landmarks=hands or None)
+
+    def detect_phone_usage(self, results):
         """
         Detect if a person is holding a phone near their face
         This is a simplified version - in reality, you'd need more sophisticated pose estimation
+        results: output of _run_hands() for the frame
         """
-        if not mediapipe_available or not self.use_traditional_api:
+        if not self.enabled:
             return False, None
-            
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_frame)
-        
+
         if results.multi_hand_landmarks:
             for hand_landmarks in results.multi_hand_landmarks:
-                # Get wrist and thumb tip coordinates
-                wrist = hand_landmarks.landmark[self.mp_hands.HandLandmark.WRIST]
-                thumb_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.THUMB_TIP]
-                
+                lm = _landmarks_to_np(hand_landmarks)
+
                 # Calculate distance between wrist and thumb tip
-                distance = np.sqrt((wrist.x - thumb_tip.x)**2 + (wrist.y - thumb_tip.y)**2)
+                distance = np.hypot(*(lm[WRIST, :2] - lm[THUMB_TIP, :2]))
                 
                 # If distance is small, it might indicate holding something
                 if distance < 0.05:  # Threshold value - needs tuning
@@ -65,58 +156,47 @@ class HandGestureRecognizer:
         
         return False, None
     
-    def detect_raised_hand(self, frame):
+    def detect_raised_hand(self, results):
         """
         Detect if a person has raised their hand (requesting help)
+        results: output of _run_hands() for the frame
         """
-        if not mediapipe_available or not self.use_traditional_api:
+        if not self.enabled:
             return False, None
-            
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_frame)
-        
+
         if results.multi_hand_landmarks:
             for hand_landmarks in results.multi_hand_landmarks:
-                # Check if wrist is lower than fingertips (indicating raised hand)
-                wrist = hand_landmarks.landmark[self.mp_hands.HandLandmark.WRIST]
-                
-                # Get finger tip positions
-                finger_tips = [
-                    hand_landmarks.landmark[self.mp_hands.HandLandmark.THUMB_TIP],
-                    hand_landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP],
-                    hand_landmarks.landmark[self.mp_hands.HandLandmark.MIDDLE_FINGER_TIP],
-                    hand_landmarks.landmark[self.mp_hands.HandLandmark.RING_FINGER_TIP],
-                    hand_landmarks.landmark[self.mp_hands.HandLandmark.PINKY_TIP]
-                ]
-                
+                lm = _landmarks_to_np(hand_landmarks)
+
                 # Check if all fingertips are higher than wrist (y-axis inverted in image)
-                if all(finger_tip.y < wrist.y for finger_tip in finger_tips):
+                if (lm[FINGER_TIPS, 1] < lm[WRIST, 1]).all():
                     return True, hand_landmarks
         
         return False, None
     
     def draw_hand_landmarks(self, frame, hand_landmarks):
         """Draw hand landmarks on the frame"""
-        if not mediapipe_available or not self.mp_drawing or not self.use_traditional_api:
+        if not self.enabled:
             return
-            
-        self.mp_drawing.draw_landmarks(
-            frame,
-            hand_landmarks,
-            self.mp_hands.HAND_CONNECTIONS
-        )
+
+        h, w = frame.shape[:2]
+        pts = (_landmarks_to_np(hand_landmarks)[:, :2] * (w, h)).astype(np.int32)
+        cv2.polylines(frame, [pts[chain] for chain in HAND_POLYLINES], False, (224, 224, 224), 2)
+        for x, y in pts[FINGER_TIPS]:
+            cv2.circle(frame, (int(x), int(y)), 3, (0, 0, 255), -1)
         
     def process_frame(self, frame):
         """Process a frame and return detection results"""
-        if not mediapipe_available or not self.use_traditional_api:
+        if not self.enabled:
             return {
                 'phone_detected': False,
                 'raised_hand_detected': False,
                 'frame': frame
             }
             
-        phone_detected, phone_hand = self.detect_phone_usage(frame)
-        raised_hand_detected, raised_hand = self.detect_raised_hand(frame)
+        results = self._run_hands(frame)
+        phone_detected, phone_hand = self.detect_phone_usage(results)
+        raised_hand_detected, raised_hand = self.detect_raised_hand(results)
         
         # Draw landmarks if hands are detected
         if phone_hand:
@@ -18,32 +18,39 @@ if not db_path.exists():
 
 print("Using database: " + str(db_path))
 
-# Connect to database
-conn = sqlite3.connect(str(db_path))
-cursor = conn.cursor()
-
-# Check if column already exists
-cursor.execute("PRAGMA table_info(exam_session)")
-columns = [col[1] for col in cursor.fetchall()]
-
-if 'is_auto_submitted' in columns:
-    print("[OK] Column 'is_auto_submitted' already exists!")
-else:
-    print("Adding 'is_auto_submitted' column to exam_session table...")
-    
-    # Add the column
-    cursor.execute('''
-        ALTER TABLE exam_session 
-        ADD COLUMN is_auto_submitted BOOLEAN DEFAULT 0
-    ''')
-    
-    conn.commit()
-    print("[OK] Column 'is_auto_submitted' added successfully!")
+# Connect to database (autocommit mode, so the transaction below is explicit)
+conn = sqlite3.connect(str(db_path), isolation_level=None)
+
+# WAL lets the app keep reading while the ALTER runs; must be set outside a transaction
+conn.execute("PRAGMA journal_mode=WAL")
+conn.execute("PRAGMA synchronous=NORMAL")
+
+# Check and add the column in one write transaction, taken up front so no other
+# writer can slip in between the check and the ALTER
+conn.execute("BEGIN IMMEDIATE")
+try:
+    columns = {col[1] for col in conn.execute("PRAGMA table_info(exam_session)")}
+
+    if 'is_auto_submitted' in columns:
+        print("[OK] Column 'is_auto_submitted' already exists!")
+    else:
+        print("Adding 'is_auto_submitted' column to exam_session table...")
+
+        # Add the column
+        conn.execute('''
+            ALTER TABLE exam_session 
+            ADD COLUMN is_auto_submitted BOOLEAN DEFAULT 0
+        ''')
+        print("[OK] Column 'is_auto_submitted' added successfully!")
+
+    conn.execute("COMMIT")
+except Exception:
+    conn.execute("ROLLBACK")
+    raise
 
 # Verify
-cursor.execute("PRAGMA table_info(exam_session)")
-columns = [col[1] for col in cursor.fetchall()]
+columns = [col[1] for col in conn.execute("PRAGMA table_info(exam_session)")]
 print("\nCurrent exam_session columns: " + ", ".join(columns))
 
 conn.close()
-print("\nMigration completed successfully!")
+print("\nMigration completed successfully!")
\ No newline at end of file
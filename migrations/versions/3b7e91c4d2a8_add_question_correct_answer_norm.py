@@ -0,0 +1,30 @@
+"""add question correct_answer_norm
+
+Revision ID: 3b7e91c4d2a8
+Revises: cf659f9202d3
+Create Date: 2026-10-15 09:12:31.504217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7e91c4d2a8'
+down_revision = 'cf659f9202d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('correct_answer_norm', sa.String(length=10), nullable=True))
+
+    # Backfill existing questions; new rows are kept in sync by Question's @validates hook
+    op.execute('UPDATE question SET correct_answer_norm = upper(trim(correct_answer)) '
+               'WHERE correct_answer IS NOT NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_column('correct_answer_norm')
@@ -0,0 +1,59 @@
+"""add alert and audit log indexes
+
+Revision ID: 5e1c7a9f3b20
+Revises: 8d2f4a6b1c93
+Create Date: 2026-10-15 13:22:48.905310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1c7a9f3b20'
+down_revision = '8d2f4a6b1c93'
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables():
+    # alerts / audit_logs only exist on deployments that created the database.models tables
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    tables = _existing_tables()
+
+    if 'alerts' in tables:
+        with op.batch_alter_table('alerts', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_alerts_session_id'), ['session_id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_alerts_user_id'), ['user_id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_alerts_timestamp'), ['timestamp'], unique=False)
+            batch_op.create_index(batch_op.f('ix_alerts_resolved'), ['resolved'], unique=False)
+            batch_op.create_index('ix_alert_session_unresolved_time', ['session_id', 'resolved', 'timestamp'], unique=False)
+
+    if 'audit_logs' in tables:
+        with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_audit_logs_user_id'), ['user_id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_audit_logs_action'), ['action'], unique=False)
+            batch_op.create_index(batch_op.f('ix_audit_logs_created_at'), ['created_at'], unique=False)
+            batch_op.create_index('ix_audit_user_time', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    tables = _existing_tables()
+
+    if 'audit_logs' in tables:
+        with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+            batch_op.drop_index('ix_audit_user_time')
+            batch_op.drop_index(batch_op.f('ix_audit_logs_created_at'))
+            batch_op.drop_index(batch_op.f('ix_audit_logs_action'))
+            batch_op.drop_index(batch_op.f('ix_audit_logs_user_id'))
+
+    if 'alerts' in tables:
+        with op.batch_alter_table('alerts', schema=None) as batch_op:
+            batch_op.drop_index('ix_alert_session_unresolved_time')
+            batch_op.drop_index(batch_op.f('ix_alerts_resolved'))
+            batch_op.drop_index(batch_op.f('ix_alerts_timestamp'))
+            batch_op.drop_index(batch_op.f('ix_alerts_user_id'))
+            batch_op.drop_index(batch_op.f('ix_alerts_session_id'))
@@ -0,0 +1,91 @@
+"""store database.models ids as native uuid
+
+Revision ID: a47c2e8d6f15
+Revises: 5e1c7a9f3b20
+Create Date: 2026-10-15 14:05:12.660394
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a47c2e8d6f15'
+down_revision = '5e1c7a9f3b20'
+branch_labels = None
+depends_on = None
+
+
+# table -> uuid columns, parents before children
+UUID_COLUMNS = {
+    'users': ['id'],
+    'exams': ['id', 'created_by'],
+    'questions': ['id', 'exam_id'],
+    'exam_sessions': ['id', 'user_id', 'exam_id'],
+    'answers': ['id', 'session_id', 'question_id', 'graded_by'],
+    'alerts': ['id', 'session_id', 'user_id', 'resolved_by'],
+    'audit_logs': ['id', 'user_id'],
+}
+
+# (table, column, referenced table) — PostgreSQL's default <table>_<column>_fkey names
+FOREIGN_KEYS = [
+    ('exams', 'created_by', 'users'),
+    ('questions', 'exam_id', 'exams'),
+    ('exam_sessions', 'user_id', 'users'),
+    ('exam_sessions', 'exam_id', 'exams'),
+    ('answers', 'session_id', 'exam_sessions'),
+    ('answers', 'question_id', 'questions'),
+    ('answers', 'graded_by', 'users'),
+    ('alerts', 'session_id', 'exam_sessions'),
+    ('alerts', 'user_id', 'users'),
+    ('alerts', 'resolved_by', 'users'),
+    ('audit_logs', 'user_id', 'users'),
+]
+
+
+def _convert(to_uuid):
+    bind = op.get_bind()
+    tables = set(sa.inspect(bind).get_table_names())
+    fks = [fk for fk in FOREIGN_KEYS if fk[0] in tables and fk[2] in tables]
+
+    if bind.dialect.name == 'postgresql':
+        # FK and PK types must change together, so drop the FKs around the ALTERs
+        for table, column, parent in fks:
+            op.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_{column}_fkey')
+        for table, columns in UUID_COLUMNS.items():
+            if table not in tables:
+                continue
+            for column in columns:
+                if to_uuid:
+                    op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} TYPE uuid USING {column}::uuid')
+                else:
+                    op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} TYPE varchar(36) USING {column}::text')
+        for table, column, parent in fks:
+            op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_fkey '
+                       f'FOREIGN KEY ({column}) REFERENCES {parent} (id)')
+        return
+
+    # Other backends keep a string column; Uuid stores 32-char hex there, so
+    # rewrite the dashed values (FK checks deferred until commit)
+    if bind.dialect.name == 'sqlite':
+        op.execute('PRAGMA defer_foreign_keys = ON')
+    for table, columns in UUID_COLUMNS.items():
+        if table not in tables:
+            continue
+        for column in columns:
+            if to_uuid:
+                op.execute(f"UPDATE {table} SET {column} = replace({column}, '-', '') WHERE {column} IS NOT NULL")
+            else:
+                op.execute(
+                    f"UPDATE {table} SET {column} = substr({column}, 1, 8) || '-' || substr({column}, 9, 4) || '-' || "
+                    f"substr({column}, 13, 4) || '-' || substr({column}, 17, 4) || '-' || substr({column}, 21) "
+                    f"WHERE {column} IS NOT NULL AND length({column}) = 32"
+                )
+
+
+def upgrade():
+    _convert(to_uuid=True)
+
+
+def downgrade():
+    _convert(to_uuid=False)
@@ -0,0 +1,53 @@
+"""server-side created_at / updated_at defaults
+
+Revision ID: c2f8b61d4e07
+Revises: a47c2e8d6f15
+Create Date: 2026-10-15 21:41:07.318552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2f8b61d4e07'
+down_revision = 'a47c2e8d6f15'
+branch_labels = None
+depends_on = None
+
+# database.models tables and whether they carry updated_at
+TIMESTAMPED_TABLES = {
+    'users': True,
+    'exams': True,
+    'questions': True,
+    'answers': True,
+    'exam_sessions': True,
+    'alerts': True,
+    'audit_logs': False,
+}
+
+
+def _existing_tables():
+    # These tables only exist on deployments that created the database.models tables
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _set_defaults(server_default):
+    tables = _existing_tables()
+    for table, has_updated_at in TIMESTAMPED_TABLES.items():
+        if table not in tables:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(),
+                                  existing_nullable=False, server_default=server_default)
+            if has_updated_at:
+                batch_op.alter_column('updated_at', existing_type=sa.DateTime(),
+                                      existing_nullable=True, server_default=server_default)
+
+
+def upgrade():
+    _set_defaults(sa.func.now())
+
+
+def downgrade():
+    _set_defaults(None)
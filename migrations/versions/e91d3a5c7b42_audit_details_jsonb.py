@@ -0,0 +1,35 @@
+"""audit_logs.details as JSONB on PostgreSQL
+
+Revision ID: e91d3a5c7b42
+Revises: c2f8b61d4e07
+Create Date: 2026-10-15 21:52:34.602118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91d3a5c7b42'
+down_revision = 'c2f8b61d4e07'
+branch_labels = None
+depends_on = None
+
+
+def _needs_change():
+    # Only PostgreSQL has JSONB, and audit_logs only exists on database.models deployments
+    bind = op.get_bind()
+    return bind.dialect.name == 'postgresql' and 'audit_logs' in sa.inspect(bind).get_table_names()
+
+
+def upgrade():
+    if _needs_change():
+        op.alter_column('audit_logs', 'details', existing_type=sa.JSON(),
+                        type_=postgresql.JSONB(), postgresql_using='details::jsonb')
+
+
+def downgrade():
+    if _needs_change():
+        op.alter_column('audit_logs', 'details', existing_type=postgresql.JSONB(),
+                        type_=sa.JSON(), postgresql_using='details::json')
@@ -1,9 +1,19 @@
-import stripe
 from flask import current_app
 
 class PaymentSystem:
     def __init__(self):
-        self.stripe = stripe
+        self._stripe = None
+
+    @property
+    def stripe(self):
+        """The stripe SDK, imported on first use so workers that never take payments don't load it"""
+        if self._stripe is None:
+            import stripe
+            # Pooled requests.Session: API calls reuse one keep-alive TLS connection
+            # instead of a fresh handshake each time
+            stripe.default_http_client = stripe.http_client.RequestsClient(verify_ssl_certs=True)
+            self._stripe = stripe
+        return self._stripe
     
     def init_stripe(self):
         self.stripe.api_key = current_app.config.get('STRIPE_SECRET_KEY')
@@ -31,3 +41,7 @@ class PaymentSystem:
             return session.url, None
         except Exception as e:
             return None, str(e)
+
+
+# Shared instance, so the pooled HTTP client lives for the whole process
+payment_system = PaymentSystem()
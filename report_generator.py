@@ -1,37 +1,49 @@
+from collections import Counter
 from datetime import datetime
-from database import ExamSession, Alert, Student
+from database import db, ExamSession, Alert
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 import json
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
 import io
 
+# Risk points per alert; also the order severities are listed in reports
+SEVERITY_WEIGHTS = {
+    'critical': 25,
+    'high': 15,
+    'medium': 8,
+    'low': 3
+}
+
 class ReportGenerator:
     def __init__(self):
         pass
     
     def generate_session_report(self, session_id):
-        session = ExamSession.query.get(session_id)
+        # Session and student in one joined SELECT
+        session = db.session.get(ExamSession, session_id, options=[joinedload(ExamSession.student)])
         if not session:
             return None
         
-        student = Student.query.get(session.student_id)
-        alerts = Alert.query.filter_by(session_id=session_id).all()
+        student = session.student
+        # Only the counts are needed, so let the database group the alerts
+        # (one row per severity/type pair instead of one per alert)
+        alert_groups = db.session.query(Alert.severity, Alert.alert_type, func.count()).filter(
+            Alert.session_id == session_id).group_by(Alert.severity, Alert.alert_type).all()
         
         # Calculate duration
         duration = None
         if session.end_time and session.start_time:
             duration = (session.end_time - session.start_time).total_seconds() / 60
         
-        # Group alerts by type
-        alert_types = {}
-        for alert in alerts:
-            if alert.alert_type not in alert_types:
-                alert_types[alert.alert_type] = 0
-            alert_types[alert.alert_type] += 1
+        # Fold the severity/type groups into per-type and per-severity totals
+        alert_types = Counter()
+        severity_counts = Counter()
+        for severity, alert_type, count in alert_groups:
+            alert_types[alert_type] += count
+            severity_counts[severity] += count
         
         # Calculate risk score (0-100)
-        risk_score = self.calculate_risk_score(alerts)
+        risk_score = self.calculate_risk_score(severity_counts)
         
         report = {
             'session_id': session.id,
@@ -48,14 +60,9 @@ class ReportGenerator:
                 'status': session.status
             },
             'alerts': {
-                'total': len(alerts),
-                'by_type': alert_types,
-                'by_severity': {
-                    'critical': len([a for a in alerts if a.severity == 'critical']),
-                    'high': len([a for a in alerts if a.severity == 'high']),
-                    'medium': len([a for a in alerts if a.severity == 'medium']),
-                    'low': len([a for a in alerts if a.severity == 'low'])
-                }
+                'total': sum(severity_counts.values()),
+                'by_type': dict(alert_types),
+                'by_severity': {k: severity_counts[k] for k in SEVERITY_WEIGHTS}
             },
             'risk_score': risk_score,
             'recommendation': self.get_recommendation(risk_score)
@@ -63,20 +70,10 @@ class ReportGenerator:
         
         return report
     
-    def calculate_risk_score(self, alerts):
-        if not alerts:
-            return 0
-        
-        severity_weights = {
-            'critical': 25,
-            'high': 15,
-            'medium': 8,
-            'low': 3
-        }
-        
-        total_score = 0
-        for alert in alerts:
-            total_score += severity_weights.get(alert.severity, 0)
+    def calculate_risk_score(self, severity_counts):
+        """severity_counts: mapping of severity -> number of alerts"""
+        total_score = sum(weight * severity_counts.get(severity, 0)
+                          for severity, weight in SEVERITY_WEIGHTS.items())
         
         # Cap at 100
         return min(total_score, 100)
@@ -99,54 +96,70 @@ class ReportGenerator:
             return True
         return False
     
-    def generate_pdf_report(self, session_id):
+    def generate_pdf_report(self, session_id, out_stream=None):
+        """
+        Writes the PDF report to out_stream (any binary file-like object) and
+        returns it, positioned at the start when seekable. Without out_stream
+        a BytesIO is used. Returns None if the session doesn't exist.
+        """
         report = self.generate_session_report(session_id)
         if not report:
             return None
+
+        # reportlab (and its font tables) is only loaded once a PDF is actually requested
+        from reportlab.lib.pagesizes import letter
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.units import inch
         
-        buffer = io.BytesIO()
+        buffer = out_stream if out_stream is not None else io.BytesIO()
         c = canvas.Canvas(buffer, pagesize=letter)
         width, height = letter
         
+        # Whole page is one text object (a single BT…ET block) rather than a
+        # separate positioned text block per drawString call
+        sections = [
+            (1.5, "Student Information", [
+                f"Name: {report['student']['name']}",
+                f"ID: {report['student']['student_id']}",
+                f"Email: {report['student']['email']}",
+            ]),
+            (2.7, "Exam Information", [
+                f"Exam: {report['exam']['name']}",
+                f"Start: {report['exam']['start_time']}",
+                f"End: {report['exam']['end_time']}",
+                f"Duration: {report['exam']['duration_minutes']} min",
+            ]),
+            (4.1, "Integrity Assessment", [
+                f"Risk Score: {report['risk_score']}/100",
+                f"Recommendation: {report['recommendation']}",
+            ]),
+            (5.1, "Alerts Summary", [
+                f"Total Alerts: {report['alerts']['total']}",
+                f"Critical: {report['alerts']['by_severity']['critical']}",
+                f"High: {report['alerts']['by_severity']['high']}",
+                f"Medium: {report['alerts']['by_severity']['medium']}",
+                f"Low: {report['alerts']['by_severity']['low']}",
+            ]),
+        ]
+
         # Header
-        c.setFont("Helvetica-Bold", 20)
-        c.drawString(1*inch, height - 1*inch, "AI Invigilator Exam Report")
-        
-        # Student Info
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(1*inch, height - 1.5*inch, "Student Information")
-        c.setFont("Helvetica", 10)
-        c.drawString(1*inch, height - 1.8*inch, f"Name: {report['student']['name']}")
-        c.drawString(1*inch, height - 2*inch, f"ID: {report['student']['student_id']}")
-        c.drawString(1*inch, height - 2.2*inch, f"Email: {report['student']['email']}")
-        
-        # Exam Info
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(1*inch, height - 2.7*inch, "Exam Information")
-        c.setFont("Helvetica", 10)
-        c.drawString(1*inch, height - 3*inch, f"Exam: {report['exam']['name']}")
-        c.drawString(1*inch, height - 3.2*inch, f"Start: {report['exam']['start_time']}")
-        c.drawString(1*inch, height - 3.4*inch, f"End: {report['exam']['end_time']}")
-        c.drawString(1*inch, height - 3.6*inch, f"Duration: {report['exam']['duration_minutes']} min")
-        
-        # Risk Score
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(1*inch, height - 4.1*inch, "Integrity Assessment")
-        c.setFont("Helvetica", 10)
-        c.drawString(1*inch, height - 4.4*inch, f"Risk Score: {report['risk_score']}/100")
-        c.drawString(1*inch, height - 4.6*inch, f"Recommendation: {report['recommendation']}")
-        
-        # Alerts
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(1*inch, height - 5.1*inch, "Alerts Summary")
-        c.setFont("Helvetica", 10)
-        c.drawString(1*inch, height - 5.4*inch, f"Total Alerts: {report['alerts']['total']}")
-        c.drawString(1*inch, height - 5.6*inch, f"Critical: {report['alerts']['by_severity']['critical']}")
-        c.drawString(1*inch, height - 5.8*inch, f"High: {report['alerts']['by_severity']['high']}")
-        c.drawString(1*inch, height - 6*inch, f"Medium: {report['alerts']['by_severity']['medium']}")
-        c.drawString(1*inch, height - 6.2*inch, f"Low: {report['alerts']['by_severity']['low']}")
+        text = c.beginText(1*inch, height - 1*inch)
+        text.setFont("Helvetica-Bold", 20)
+        text.textLine("AI Invigilator Exam Report")
+
+        for top, title, lines in sections:
+            text.setTextOrigin(1*inch, height - top*inch)
+            text.setFont("Helvetica-Bold", 12)
+            text.textLine(title)
+            # Body lines start 0.3" under the heading, 0.2" apart
+            text.setTextOrigin(1*inch, height - (top + 0.3)*inch)
+            text.setFont("Helvetica", 10, leading=0.2*inch)
+            text.textLines(lines)
+
+        c.drawText(text)
         
         c.showPage()
         c.save()
-        buffer.seek(0)
+        if buffer.seekable():
+            buffer.seek(0)
         return buffer
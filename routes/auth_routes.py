@@ -1,25 +1,117 @@
 import logging
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, abort, current_app, request, session
 from marshmallow import ValidationError
 from datetime import datetime
-from utils.validators import StudentRegistrationSchema
+from fastjsonschema import JsonSchemaValueException
+from utils.validators import StudentRegistrationSchema, validate_change_password
 from utils.error_handlers import (
     AuthenticationError, ValidationError as ValidationErr,
     ResourceNotFoundError, DatabaseError
 )
 from auth.authentication import (
-    AuthenticationManager, SessionManager, PasswordManager
+    auth_manager, SessionManager, PasswordManager
 )
 from database.models import db, User, AuditLog
+from config import Config
+from types import SimpleNamespace
+from sqlalchemy import select, update
+import orjson
 import uuid
 
+try:
+    import redis
+except ImportError:
+    redis = None
+
 logger = logging.getLogger(__name__)
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
-# Initialize authentication manager
-auth_manager = AuthenticationManager()
 registration_schema = StudentRegistrationSchema()
 
+# Auth payloads are a few hundred bytes; anything past this is rejected unparsed
+MAX_AUTH_BODY = 8192
+
+# Non-secret login columns; cached per email so repeat logins skip the email lookup
+_LOGIN_COLUMNS = ('id', 'email', 'role')
+# Always read from the users table by primary key: a hash never leaves the
+# database, and deactivation takes effect on the next login
+_LIVE_COLUMNS = ('password_hash', 'is_active')
+_user_cache = redis.Redis.from_url(Config.REDIS_URL) if redis and Config.REDIS_URL else None
+
+
+def _json(obj):
+    """jsonify() replacement: orjson encodes straight to bytes (datetimes/UUIDs natively)."""
+    return current_app.response_class(
+        orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS), mimetype='application/json'
+    )
+
+
+def _user_cache_key(email):
+    return f'user:email:{email}'
+
+
+def _get_login_user(email):
+    """Login fields for ``email`` (or None); the non-secret ones come from Redis when configured."""
+    key = _user_cache_key(email)
+    if _user_cache is not None:
+        try:
+            cached = _user_cache.get(key)
+            if cached:
+                fields = orjson.loads(cached)
+                row = db.session.execute(
+                    select(*(getattr(User, c) for c in _LIVE_COLUMNS)).where(User.id == fields['id'])
+                ).one_or_none()
+                if row is not None:
+                    return SimpleNamespace(**fields, **dict(zip(_LIVE_COLUMNS, row)))
+                # User was deleted since it was cached
+                _invalidate_user_cache(email)
+                return None
+        except redis.RedisError as e:
+            logger.warning(f'User cache read failed: {str(e)}')
+
+    row = db.session.execute(
+        select(*(getattr(User, c) for c in _LOGIN_COLUMNS + _LIVE_COLUMNS)).where(User.email == email)
+    ).one_or_none()
+    if row is None:
+        return None
+
+    fields = dict(zip(_LOGIN_COLUMNS, row))
+    if _user_cache is not None:
+        try:
+            _user_cache.setex(key, Config.USER_CACHE_TTL, orjson.dumps(fields, default=str))
+        except redis.RedisError as e:
+            logger.warning(f'User cache write failed: {str(e)}')
+    return SimpleNamespace(**fields, **dict(zip(_LIVE_COLUMNS, row[len(_LOGIN_COLUMNS):])))
+
+
+def _invalidate_user_cache(email):
+    """Drop the cached login row after anything it holds changes."""
+    if _user_cache is None:
+        return
+    try:
+        _user_cache.delete(_user_cache_key(email))
+    except redis.RedisError as e:
+        logger.warning(f'User cache invalidation failed: {str(e)}')
+
+
+@auth_bp.before_request
+def _reject_bad_bodies():
+    """Refuse oversized or non-JSON POST bodies from the headers alone, before any parsing."""
+    if request.method != 'POST':
+        return
+    length = request.content_length
+    if length and length > MAX_AUTH_BODY:
+        abort(413)
+    # Body-less POSTs (logout, refresh-token) carry no content type
+    if length and not request.is_json:
+        abort(415)
+
+
+@auth_bp.record_once
+def _start_audit_flusher(state):
+    # Audit rows are batched by a background writer once the blueprint is live
+    AuditLog.start_flusher(state.app)
+
 # ==================== AUTHENTICATION ROUTES ====================
 
 @auth_bp.route('/register', methods=['POST'])
@@ -34,14 +126,17 @@ def register():
         validated_data = registration_schema.load(data)
         
         # Check if user already exists
-        existing_user = User.query.filter_by(email=validated_data['email']).first()
+        # Existence only: the unique email index answers this without reading the row
+        existing_user = db.session.execute(
+            select(User.id).where(User.email == validated_data['email'])
+        ).scalar_one_or_none()
         if existing_user:
             logger.warning(f'Registration attempt with existing email: {validated_data["email"]}')
             raise ValidationErr('Email already registered', details={'email': 'This email is already in use'})
         
         # Create new user
         user_id = str(uuid.uuid4())
-        password_hash = PasswordManager.hash_password(validated_data['password'])
+        password_hash = PasswordManager.hash_password_async(validated_data['password']).result()
         
         new_user = User(
             id=user_id,
@@ -69,7 +164,7 @@ def register():
         
         logger.info(f'New user registered: {validated_data["email"]}')
         
-        return jsonify({
+        return _json({
             'message': 'Registration successful',
             'user_id': user_id,
             'email': validated_data['email']
@@ -95,13 +190,13 @@ def login():
         password = data['password']
         
         # Find user
-        user = User.query.filter_by(email=email).first()
+        user = _get_login_user(email)
         if not user:
             logger.warning(f'Login attempt with non-existent email: {email}')
             raise AuthenticationError('Invalid email or password')
         
         # Verify password
-        if not PasswordManager.verify_password(user.password_hash, password):
+        if not PasswordManager.verify_password_async(user.password_hash, password).result():
             logger.warning(f'Failed login attempt for user: {email}')
             raise AuthenticationError('Invalid email or password')
         
@@ -110,22 +205,31 @@ def login():
             logger.warning(f'Login attempt for inactive user: {email}')
             raise AuthenticationError('Account is inactive')
         
-        # Create session
-        SessionManager.create_session(user.id, user.role, remember_me=data.get('remember_me', False))
-        
-        # Generate token
-        token = auth_manager.generate_token(user.id, user.role)
+        # Transparently migrate legacy PBKDF2 / bcrypt hashes to current Argon2id settings
+        if PasswordManager.needs_rehash(user.password_hash):
+            db.session.execute(
+                update(User).where(User.id == user.id)
+                .values(password_hash=PasswordManager.hash_password_async(password).result())
+            )
+            db.session.commit()
         
-        # Log audit
+        # Queue the audit row first so the flusher's INSERT overlaps the
+        # session update and HS256 signing below
         AuditLog.log_action(
             user_id=user.id,
             action='USER_LOGIN',
             ip_address=request.remote_addr
         )
         
+        # Create session
+        SessionManager.create_session(user.id, user.role, remember_me=data.get('remember_me', False))
+        
+        # Generate token
+        token = auth_manager.generate_token(user.id, user.role)
+        
         logger.info(f'User logged in: {email}')
         
-        return jsonify({
+        return _json({
             'message': 'Login successful',
             'user_id': user.id,
             'email': user.email,
@@ -158,7 +262,7 @@ def logout():
         
         logger.info(f'User logged out: {user_id}')
         
-        return jsonify({'message': 'Logout successful'}), 200
+        return _json({'message': 'Logout successful'}), 200
     except Exception as e:
         logger.error(f'Logout error: {str(e)}')
         raise
@@ -177,7 +281,7 @@ def refresh_token():
         if not new_token:
             raise AuthenticationError('Invalid or expired token')
         
-        return jsonify({
+        return _json({
             'message': 'Token refreshed',
             'token': new_token
         }), 200
@@ -194,7 +298,9 @@ def change_password():
             raise AuthenticationError('Not authenticated')
         
         data = request.get_json()
-        if not data or not all(k in data for k in ['old_password', 'new_password', 'confirm_password']):
+        try:
+            validate_change_password(data)
+        except JsonSchemaValueException:
             raise ValidationErr('Old password, new password, and confirm password required')
         
         # Validate new password strength
@@ -211,12 +317,13 @@ def change_password():
             raise ResourceNotFoundError('User', user_id)
         
         # Verify old password
-        if not PasswordManager.verify_password(user.password_hash, data['old_password']):
+        if not PasswordManager.verify_password_async(user.password_hash, data['old_password']).result():
             raise AuthenticationError('Invalid old password')
         
         # Update password
-        user.password_hash = PasswordManager.hash_password(data['new_password'])
+        user.password_hash = PasswordManager.hash_password_async(data['new_password']).result()
         db.session.commit()
+        _invalidate_user_cache(user.email)
         
         # Log audit
         AuditLog.log_action(
@@ -227,7 +334,7 @@ def change_password():
         
         logger.info(f'Password changed for user: {user_id}')
         
-        return jsonify({'message': 'Password changed successfully'}), 200
+        return _json({'message': 'Password changed successfully'}), 200
     except Exception as e:
         logger.error(f'Change password error: {str(e)}')
         db.session.rollback()
@@ -242,12 +349,14 @@ def password_reset_request():
             raise ValidationErr('Email required')
         
         email = data['email'].strip()
-        user = User.query.filter_by(email=email).first()
+        user = db.session.execute(
+            select(User.id, User.role).where(User.email == email)
+        ).one_or_none()
         
         if not user:
             # Don't reveal if email exists
             logger.info(f'Password reset requested for non-existent email: {email}')
-            return jsonify({'message': 'If email exists, reset link will be sent'}), 200
+            return _json({'message': 'If email exists, reset link will be sent'}), 200
         
         # Generate reset token
         reset_token = auth_manager.generate_token(
@@ -261,7 +370,7 @@ def password_reset_request():
         
         # TODO: Send email with reset token
         
-        return jsonify({'message': 'If email exists, reset link will be sent'}), 200
+        return _json({'message': 'If email exists, reset link will be sent'}), 200
     except Exception as e:
         logger.error(f'Password reset request error: {str(e)}')
         raise
@@ -271,7 +380,7 @@ def password_reset_request():
 @auth_bp.errorhandler(ValidationErr)
 def handle_validation_error(error):
     """Handle validation errors."""
-    return jsonify({
+    return _json({
         'error': 'Validation Error',
         'message': error.message,
         'details': error.details
@@ -280,7 +389,7 @@ def handle_validation_error(error):
 @auth_bp.errorhandler(AuthenticationError)
 def handle_auth_error(error):
     """Handle authentication errors."""
-    return jsonify({
+    return _json({
         'error': 'Authentication Error',
         'message': error.message
     }), error.status_code
@@ -288,7 +397,7 @@ def handle_auth_error(error):
 @auth_bp.errorhandler(DatabaseError)
 def handle_db_error(error):
     """Handle database errors."""
-    return jsonify({
+    return _json({
         'error': 'Database Error',
         'message': error.message
     }), error.status_code
\ No newline at end of file
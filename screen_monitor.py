@@ -1,8 +1,21 @@
 import threading
 import time
-from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import numpy as np
+
+# Alert callbacks run on a small shared pool: no thread start per event, and a
+# burst of focus events queues up instead of spawning one OS thread each
+_alert_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='alert')
+
+# Focus history is a fixed ring of (timestamp, kind) columns rather than a deque
+# of dicts: recording an event is two array stores, no per-event allocation
+FOCUS_HISTORY_SIZE = 500
+RECENT_EVENTS = 20
+TAB_SWITCH, WINDOW_BLUR, WINDOW_FOCUS = 0, 1, 2
+_KINDS = ('tab_switch', 'window_blur', 'window_focus')
+
 
 class ScreenSessionMonitor:
     """
@@ -18,14 +31,29 @@ class ScreenSessionMonitor:
         # Thread-safe state
         self._lock = threading.Lock()
 
-        # Event history (capped to prevent unbounded memory growth)
-        self._focus_events = deque(maxlen=500)
+        # Event history ring (capped to prevent unbounded memory growth);
+        # _head counts every event ever recorded, slot is _head % size
+        self._ts = np.zeros(FOCUS_HISTORY_SIZE, dtype=np.float64)
+        self._kind = np.zeros(FOCUS_HISTORY_SIZE, dtype=np.uint8)
+        self._head = 0
         self._tab_switch_count = 0
         self._window_blur_count = 0
         self._is_focused = True
-        self._last_focus_time = datetime.utcnow()
+        self._last_focus_time = time.monotonic()  # durations only, so monotonic
         self._total_focus_lost_duration = 0.0  # seconds
 
+    def _record(self, kind, ts):
+        # Caller holds self._lock
+        i = self._head % FOCUS_HISTORY_SIZE
+        self._ts[i] = ts
+        self._kind[i] = kind
+        self._head += 1
+
+    def _event(self, kind, ts):
+        # Same shape callbacks always got (and recent_events uses): ISO 'timestamp'
+        return {'timestamp': datetime.utcfromtimestamp(ts).isoformat(),
+                'type': _KINDS[kind], 'session_id': self.session_id}
+
     # ──────────────────────────────────────────────
     # Event handlers (called from Flask routes)
     # ──────────────────────────────────────────────
@@ -35,94 +63,85 @@ class ScreenSessionMonitor:
         Call this when the student switches to another browser tab.
         Thread-safe — can be called from any thread.
         """
-        now = datetime.utcnow()
-        event = {
-            'timestamp': now.isoformat(),
-            'type': 'tab_switch',
-            'session_id': self.session_id
-        }
+        # Raw epoch float; formatted to ISO only when statistics are read
+        ts = time.time()
 
         with self._lock:
             self._tab_switch_count += 1
             self._is_focused = False
-            self._focus_events.append(event)
+            self._record(TAB_SWITCH, ts)
             count = self._tab_switch_count
 
         # Fire alert callback outside the lock to prevent deadlocks
         if self.alert_callback and count >= self.tab_switch_threshold:
-            threading.Thread(
-                target=self.alert_callback,
-                args=(self.session_id, event, count),
-                daemon=True
-            ).start()
+            _alert_executor.submit(self.alert_callback, self.session_id, self._event(TAB_SWITCH, ts), count)
 
     def detect_window_blur(self):
         """
         Call this when the browser window loses focus (alt-tab, etc.).
         Thread-safe.
         """
-        now = datetime.utcnow()
-        event = {
-            'timestamp': now.isoformat(),
-            'type': 'window_blur',
-            'session_id': self.session_id
-        }
+        ts = time.time()
 
         with self._lock:
             self._window_blur_count += 1
             self._is_focused = False
-            self._focus_events.append(event)
+            self._record(WINDOW_BLUR, ts)
+            count = self._window_blur_count
 
         if self.alert_callback:
-            threading.Thread(
-                target=self.alert_callback,
-                args=(self.session_id, event, self._window_blur_count),
-                daemon=True
-            ).start()
+            _alert_executor.submit(self.alert_callback, self.session_id, self._event(WINDOW_BLUR, ts), count)
 
     def detect_window_focus(self):
         """
         Call this when the student returns focus to the exam window.
         Calculates how long they were away. Thread-safe.
         """
-        now = datetime.utcnow()
+        now = time.monotonic()
+        ts = time.time()
 
         with self._lock:
             if not self._is_focused:
                 # Calculate how long focus was lost
-                duration = (now - self._last_focus_time).total_seconds()
-                self._total_focus_lost_duration += duration
+                self._total_focus_lost_duration += now - self._last_focus_time
 
             self._is_focused = True
             self._last_focus_time = now
-            self._focus_events.append({
-                'timestamp': now.isoformat(),
-                'type': 'window_focus',
-                'session_id': self.session_id
-            })
+            self._record(WINDOW_FOCUS, ts)
 
     def get_statistics(self):
         """Return a thread-safe snapshot of this session's screen activity."""
         with self._lock:
-            return {
+            stats = {
                 'session_id': self.session_id,
                 'total_tab_switches': self._tab_switch_count,
                 'total_window_blurs': self._window_blur_count,
                 'is_focused': self._is_focused,
                 'total_focus_lost_seconds': round(self._total_focus_lost_duration, 1),
                 'focus_lost_count': self._tab_switch_count + self._window_blur_count,
-                'recent_events': list(self._focus_events)[-20:]  # Last 20 events
             }
+            # Last RECENT_EVENTS slots, oldest first; fancy indexing copies them
+            idx = np.arange(max(0, self._head - RECENT_EVENTS), self._head) % FOCUS_HISTORY_SIZE
+            recent_ts = self._ts[idx].tolist()
+            recent_kind = self._kind[idx].tolist()
+
+        # Only the returned events are turned back into dicts, off the lock
+        stats['recent_events'] = [
+            {'timestamp': datetime.utcfromtimestamp(ts).isoformat(),
+             'type': _KINDS[kind], 'session_id': self.session_id}
+            for ts, kind in zip(recent_ts, recent_kind)
+        ]
+        return stats
 
     def reset(self):
         """Reset all counters for this session. Thread-safe."""
         with self._lock:
             self._tab_switch_count = 0
             self._window_blur_count = 0
-            self._focus_events.clear()
+            self._head = 0
             self._is_focused = True
             self._total_focus_lost_duration = 0.0
-            self._last_focus_time = datetime.utcnow()
+            self._last_focus_time = time.monotonic()
 
 
 class ScreenMonitor:
@@ -151,6 +170,8 @@ class ScreenMonitor:
 
     def __init__(self, tab_switch_threshold=3):
         self.tab_switch_threshold = tab_switch_threshold
+        # Copy-on-write: never mutated in place, only replaced under _lock, so
+        # readers can use whichever dict they see without locking
         self._sessions: dict[int, ScreenSessionMonitor] = {}
         self._lock = threading.Lock()
 
@@ -159,16 +180,20 @@ class ScreenMonitor:
         with self._lock:
             if session_id in self._sessions:
                 return
-            self._sessions[session_id] = ScreenSessionMonitor(
+            monitor = ScreenSessionMonitor(
                 session_id=session_id,
                 alert_callback=alert_callback,
                 tab_switch_threshold=self.tab_switch_threshold
             )
+            self._sessions = {**self._sessions, session_id: monitor}
 
     def stop_session(self, session_id: int):
         """Remove a finished session from monitoring."""
         with self._lock:
-            self._sessions.pop(session_id, None)
+            if session_id in self._sessions:
+                sessions = dict(self._sessions)
+                del sessions[session_id]
+                self._sessions = sessions
 
     def tab_switch(self, session_id: int):
         """Route a tab switch event to the correct session."""
@@ -195,11 +220,9 @@ class ScreenMonitor:
 
     def get_all_statistics(self):
         """Get stats for all active sessions."""
-        with self._lock:
-            session_ids = list(self._sessions.keys())
-        return {sid: self._sessions[sid].get_statistics() for sid in session_ids}
+        sessions = self._sessions  # one consistent snapshot
+        return {sid: monitor.get_statistics() for sid, monitor in sessions.items()}
 
     def _get_session(self, session_id: int):
-        """Thread-safe session lookup."""
-        with self._lock:
-            return self._sessions.get(session_id)
\ No newline at end of file
+        """Lock-free session lookup (the dict is swapped, never mutated)."""
+        return self._sessions.get(session_id)
\ No newline at end of file
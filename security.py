@@ -2,10 +2,30 @@ import os
 import re
 import hashlib
 import hmac
+import logging
+import mmap
+import secrets
+import ssl
 import time
+import fastjsonschema
+from fastjsonschema import JsonSchemaValueException
 from werkzeug.utils import secure_filename
 from functools import wraps
-from flask import abort, request, session, jsonify
+from flask import abort, g, request, session, jsonify
+
+logger = logging.getLogger(__name__)
+
+# Compiled at import so sanitize_input calls Pattern.sub directly
+_TAG_RE = re.compile(r'<[^>]*>')
+# Escapes stray angle brackets in one translate pass
+_HTML_TABLE = str.maketrans({'<': '&lt;', '>': '&gt;'})
+
+# Field validators compiled once at import into plain Python functions
+# (fastjsonschema code generation); they raise JsonSchemaValueException on failure
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+STUDENT_ID_PATTERN = r'^[A-Za-z0-9_-]{3,20}$'
+_validate_email = fastjsonschema.compile({'type': 'string', 'pattern': EMAIL_PATTERN})
+_validate_student_id = fastjsonschema.compile({'type': 'string', 'pattern': STUDENT_ID_PATTERN})
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Known datacenter/VM/cloud IP ranges (simplified - extend as needed)
@@ -24,6 +44,48 @@ AUTOMATION_HEADERS = [
     'x-playwright',
 ]
 
+# One C-level scan per request instead of a Python loop per list entry
+_AUTO_UA_RE = re.compile('|'.join(map(re.escape, SUSPICIOUS_USER_AGENTS)))
+_AUTO_HDRS = frozenset(AUTOMATION_HEADERS)
+
+
+# Uploads are copied to disk 1 MiB at a time (werkzeug's default is 16 KiB)
+UPLOAD_BUFFER_SIZE = 1 << 20
+
+# Files at least this large are hashed through mmap instead of reads
+MMAP_HASH_THRESHOLD = 16 << 20
+
+# Extension whitelist for photo uploads, shared by upload call sites
+ALLOWED_IMAGE_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg'})
+
+
+def _check_sha256_backend():
+    """
+    Warn once at import if SHA-256 isn't served by OpenSSL. Only OpenSSL's EVP
+    path (>= 1.1.1) dispatches to SHA-NI / ARMv8 SHA2 instructions at runtime;
+    CPython's builtin fallback is plain C and several times slower on uploads.
+    """
+    if 'sha256' not in hashlib.algorithms_guaranteed:
+        logger.error("hashlib has no sha256 - file integrity checks will fail")
+        return False
+    if hashlib.sha256.__name__ != 'openssl_sha256' or ssl.OPENSSL_VERSION_INFO < (1, 1, 1):
+        logger.warning("SHA-256 is not using OpenSSL >= 1.1.1 (%s); "
+                       "file hashing will not use SHA-NI / ARMv8 crypto extensions", ssl.OPENSSL_VERSION)
+        return False
+    return True
+
+
+_SHA256_ACCELERATED = _check_sha256_backend()
+
+
+def _fingerprint_source():
+    headers = request.headers
+    return '|'.join((
+        headers.get('User-Agent', ''),
+        headers.get('Accept-Language', ''),
+        headers.get('Accept-Encoding', ''),
+    ))
+
 
 class SecurityUtils:
     """Security utilities for data protection and anti-tampering"""
@@ -32,8 +94,9 @@ class SecurityUtils:
 
     @staticmethod
     def allowed_file(filename, allowed_extensions):
-        return '.' in filename and \
-               filename.rsplit('.', 1)[1].lower() in allowed_extensions
+        # Pass a frozenset (e.g. ALLOWED_IMAGE_EXTENSIONS) for O(1) membership
+        ext = os.path.splitext(filename)[1][1:].lower()
+        return bool(ext) and ext in allowed_extensions
 
     @staticmethod
     def secure_upload(file, upload_folder, allowed_extensions):
@@ -45,12 +108,13 @@ class SecurityUtils:
 
         filename = secure_filename(file.filename)
         name, ext = os.path.splitext(filename)
-        hash_suffix = hashlib.md5(str(os.urandom(16)).encode()).hexdigest()[:8]
+        # 32 random bits to keep same-named uploads apart
+        hash_suffix = secrets.token_hex(4)
         filename = f"{name}_{hash_suffix}{ext}"
 
         os.makedirs(upload_folder, exist_ok=True)
         filepath = os.path.join(upload_folder, filename)
-        file.save(filepath)
+        file.save(filepath, buffer_size=UPLOAD_BUFFER_SIZE)
 
         return filename, None
 
@@ -60,28 +124,41 @@ class SecurityUtils:
     def sanitize_input(text, max_length=1000):
         if not text:
             return ""
-        text = re.sub(r'<[^>]*>', '', str(text))
-        text = text[:max_length]
-        text = text.replace('<', '&lt;').replace('>', '&gt;')
-        return text.strip()
+        text = _TAG_RE.sub('', str(text))[:max_length]
+        return text.translate(_HTML_TABLE).strip()
 
     @staticmethod
     def validate_email(email):
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
+        try:
+            _validate_email(email)
+            return True
+        except JsonSchemaValueException:
+            return False
 
     @staticmethod
     def validate_student_id(student_id):
-        pattern = r'^[A-Za-z0-9_-]{3,20}$'
-        return re.match(pattern, student_id) is not None
+        try:
+            _validate_student_id(student_id)
+            return True
+        except JsonSchemaValueException:
+            return False
 
     @staticmethod
     def hash_file(filepath):
-        sha256_hash = hashlib.sha256()
-        with open(filepath, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
+        with open(filepath, "rb", buffering=0) as f:
+            if os.fstat(f.fileno()).st_size >= MMAP_HASH_THRESHOLD:
+                # One update() over the mapped file: OpenSSL (SHA-NI where available)
+                # hashes it in C with the GIL released, no per-block Python loop
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, 'madvise'):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)  # deeper kernel read-ahead
+                    sha256_hash = hashlib.sha256()
+                    sha256_hash.update(mm)
+                    return sha256_hash.hexdigest()
+
+            # file_digest readinto()s one reused 256 KiB buffer (a Python loop);
+            # each update() hashes it in C with the GIL released
+            return hashlib.file_digest(f, "sha256").hexdigest()
 
     # ── Request Fingerprinting ────────────────────────────────────────────
 
@@ -90,14 +167,14 @@ class SecurityUtils:
         """
         Creates a fingerprint of the current request for session binding.
         Used to detect if a session token is being used from a different device.
+        Computed once per request and memoized on ``g``.
         """
-        components = [
-            request.headers.get('User-Agent', ''),
-            request.headers.get('Accept-Language', ''),
-            request.headers.get('Accept-Encoding', ''),
-        ]
-        raw = '|'.join(components)
-        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+        fp = getattr(g, '_device_fp', None)
+        if fp is None:
+            # 128-bit BLAKE2s: same 32 hex chars as before, cheaper than SHA-256
+            fp = hashlib.blake2s(_fingerprint_source().encode(), digest_size=16).hexdigest()
+            g._device_fp = fp
+        return fp
 
     @staticmethod
     def is_automated_request():
@@ -108,14 +185,15 @@ class SecurityUtils:
         user_agent = request.headers.get('User-Agent', '').lower()
 
         # Check for headless/automation user agents
-        for suspicious in SUSPICIOUS_USER_AGENTS:
-            if suspicious in user_agent:
-                return True, f"Suspicious user agent: {suspicious}"
+        match = _AUTO_UA_RE.search(user_agent)
+        if match:
+            return True, f"Suspicious user agent: {match.group(0)}"
 
-        # Check for automation-specific headers
-        for header in AUTOMATION_HEADERS:
-            if request.headers.get(header):
-                return True, f"Automation header detected: {header}"
+        # Check for automation-specific headers (present with a non-empty value)
+        hits = _AUTO_HDRS.intersection(k.lower() for k, v in request.headers.items() if v)
+        if hits:
+            header = next(h for h in AUTOMATION_HEADERS if h in hits)
+            return True, f"Automation header detected: {header}"
 
         # Check for missing headers that real browsers always send
         if not request.headers.get('Accept'):
@@ -149,7 +227,10 @@ class SecurityUtils:
             return True, None  # No fingerprint stored — allow (exam not started yet)
 
         current_fp = SecurityUtils.get_request_fingerprint()
-        if current_fp != stored_fp:
+        if current_fp != stored_fp and not hmac.compare_digest(
+            hashlib.sha256(_fingerprint_source().encode()).hexdigest()[:32], stored_fp
+        ):
+            # Second check keeps exams bound before the BLAKE2s switch valid
             return False, "Device fingerprint mismatch — possible session hijack"
 
         # Warn (but don't block) on IP change — mobile networks can change IP
@@ -170,7 +251,8 @@ def require_role(role):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if 'role' not in session or session['role'] != role:
+            # One lookup; a missing role is None and fails the comparison
+            if session.get('role') != role:
                 abort(403)
             return f(*args, **kwargs)
         return decorated_function
@@ -212,11 +294,10 @@ def validate_csrf(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if request.method == 'POST':
-            token = request.form.get('csrf_token') or \
-                    request.headers.get('X-CSRF-Token')
-            if not token or not hmac.compare_digest(
-                str(token), str(session.get('csrf_token', ''))
-            ):
+            # Header first: JSON clients never pay for parsing a form body
+            token = request.headers.get('X-CSRF-Token') or request.form.get('csrf_token')
+            stored = session.get('csrf_token')
+            if not stored or not token or not hmac.compare_digest(token, stored):
                 abort(403)
         return f(*args, **kwargs)
     return decorated_function
@@ -1,5 +1,78 @@
 import requests
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import Config
+
+# Gateway calls reuse pooled keep-alive connections. Only connection failures
+# are retried: POST is not in Retry's default allowed_methods, so urllib3 does
+# not retry it on read errors or on status codes (a status_forcelist would be
+# a no-op). A request that may have reached the gateway is never replayed, so
+# a message is not sent twice
+_RETRY = Retry(total=3, connect=3, read=0, backoff_factor=0.3)
+REQUEST_TIMEOUT = 10
+
+# Africa's Talking takes a comma-separated "to" list; one POST per batch
+BULK_BATCH_SIZE = 500
+# Per-recipient statusCode values the gateway uses for accepted messages
+_ACCEPTED_CODES = frozenset({100, 101, 102})
+# HTTP statuses meaning the batch payload was rejected, worth retrying per recipient
+_BATCH_REJECT_CODES = frozenset({400, 422})
+
+
+# Notification templates, built once; a cohort-wide blast of the same exam renders
+# identical bytes, which send_bulk_sms can then ship in one batched request
+_TPL_REMINDER = ("Hello {name}, your exam '{exam}' is scheduled for {time}. Login at http://ouk-exams.com "
+                 "to take your exam. - Open University of Kenya")
+_TPL_STARTED = "Hello {name}, your exam '{exam}' has started. Good luck! - OUK"
+_TPL_COMPLETED = ("Hello {name}, your exam '{exam}' has been submitted successfully. "
+                  "Results will be available soon. - OUK")
+_TPL_AUTO_SUBMITTED = ("Hello {name}, your exam '{exam}' has been automatically submitted due to time expiry. "
+                       "Results will be available soon. - OUK")
+
+# Individual sends are network-bound (requests releases the GIL), so they fan out
+# over a shared pool whose size matches the session's connection pool headroom
+_send_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='sms')
+
+
+class _RateLimiter:
+    """Token bucket shared by the send threads; rate <= 0 disables it."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._tokens = rate
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+@lru_cache(maxsize=4096)  # reminder waves hit the same numbers repeatedly
+def _normalize(phone_number):
+    """Ensure an E.164 number, defaulting to Kenya (+254)."""
+    if phone_number.startswith('+'):
+        return phone_number
+    if phone_number.startswith('0'):
+        return '+254' + phone_number[1:]
+    if phone_number.startswith('254'):
+        return '+' + phone_number
+    return '+254' + phone_number
 
 class SMSService:
     def __init__(self):
@@ -7,6 +80,17 @@ class SMSService:
         self.username = os.environ.get('AFRICASTALKING_USERNAME', 'sandbox')
         self.sender_id = os.environ.get('AFRICASTALKING_SENDER_ID', 'AI_INVIGILATOR')
         self.base_url = "https://api.africastalking.com/version1/messaging"
+        # Provider rate limit for per-recipient fallback sends (0 = unlimited)
+        self._limiter = _RateLimiter(Config.AFRICASTALKING_MAX_QPS)
+
+        # One session per service: TLS handshake once, then keep-alive for every send
+        self._session = requests.Session()
+        self._session.headers.update({
+            'apiKey': self.api_key or '',
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Accept': 'application/json'
+        })
+        self._session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=_RETRY))
         
         # Check if required credentials are available
         if not self.api_key:
@@ -21,64 +105,87 @@ class SMSService:
         if not self.api_key:
             return {'success': False, 'error': 'SMS service not configured (missing API key)'}
         
-        try:
-            # Ensure phone number starts with +
-            if not phone_number.startswith('+'):
-                if phone_number.startswith('0'):
-                    phone_number = '+254' + phone_number[1:]
-                elif phone_number.startswith('254'):
-                    phone_number = '+' + phone_number
-                else:
-                    phone_number = '+254' + phone_number
-
-            headers = {
-                'apiKey': self.api_key,
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'Accept': 'application/json'
-            }
+        return self._post(_normalize(phone_number), message)
 
+    def _post(self, to, message):
+        """POST one message to ``to`` (a number or comma-separated numbers)."""
+        try:
             data = {
                 'username': self.username,
-                'to': phone_number,
+                'to': to,
                 'message': message,
                 'from': self.sender_id
             }
 
-            response = requests.post(self.base_url, headers=headers, data=data)
+            response = self._session.post(self.base_url, data=data, timeout=REQUEST_TIMEOUT)
 
             if response.status_code == 201:
                 result = response.json()
                 return {'success': True, 'data': result}
             else:
-                return {'success': False, 'error': f'API Error: {response.status_code}'}
+                return {'success': False, 'error': f'API Error: {response.status_code}',
+                        'status_code': response.status_code}
 
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def _send_limited(self, phone_number, message):
+        self._limiter.acquire()
+        return self.send_sms(phone_number, message)
+    
     def send_exam_reminder(self, phone_number, student_name, exam_name, exam_time):
         """Send exam reminder SMS"""
-        message = f"Hello {student_name}, your exam '{exam_name}' is scheduled for {exam_time}. Login at http://ouk-exams.com to take your exam. - Open University of Kenya"
-        return self.send_sms(phone_number, message)
+        return self.send_sms(phone_number, _TPL_REMINDER.format(name=student_name, exam=exam_name, time=exam_time))
     
     def send_exam_started(self, phone_number, student_name, exam_name):
         """Notify when exam starts"""
-        message = f"Hello {student_name}, your exam '{exam_name}' has started. Good luck! - OUK"
-        return self.send_sms(phone_number, message)
+        return self.send_sms(phone_number, _TPL_STARTED.format(name=student_name, exam=exam_name))
     
     def send_exam_completed(self, phone_number, student_name, exam_name):
         """Notify when exam is submitted"""
-        message = f"Hello {student_name}, your exam '{exam_name}' has been submitted successfully. Results will be available soon. - OUK"
-        return self.send_sms(phone_number, message)
+        return self.send_sms(phone_number, _TPL_COMPLETED.format(name=student_name, exam=exam_name))
 
     def send_exam_auto_submitted(self, phone_number, student_name, exam_name):
         """Notify when exam is auto-submitted due to time expiry"""
-        message = f"Hello {student_name}, your exam '{exam_name}' has been automatically submitted due to time expiry. Results will be available soon. - OUK"
-        return self.send_sms(phone_number, message)
+        return self.send_sms(phone_number, _TPL_AUTO_SUBMITTED.format(name=student_name, exam=exam_name))
 
     def send_bulk_sms(self, phone_numbers, message):
-        """Send SMS to multiple recipients"""
+        """Send SMS to multiple recipients, BULK_BATCH_SIZE numbers per API call"""
+        if not self.api_key:
+            error = {'success': False, 'error': 'SMS service not configured (missing API key)'}
+            return [{'phone': phone, 'result': error} for phone in phone_numbers]
+
         results = []
-        for phone in phone_numbers:
-            result = self.send_sms(phone, message)
-            results.append({'phone': phone, 'result': result})
+        for i in range(0, len(phone_numbers), BULK_BATCH_SIZE):
+            batch = phone_numbers[i:i + BULK_BATCH_SIZE]
+            normalized = [_normalize(phone) for phone in batch]
+            response = self._post(','.join(normalized), message)
+
+            if not response['success']:
+                if response.get('status_code') in _BATCH_REJECT_CODES:
+                    # Gateway refused the batch (e.g. one malformed number): retry each recipient.
+                    # Auth failures (401/403) and other errors would fail per recipient too
+                    results.extend(_send_pool.map(
+                        lambda phone: {'phone': phone, 'result': self._send_limited(phone, message)}, batch
+                    ))
+                else:
+                    results.extend({'phone': phone, 'result': response} for phone in batch)
+                continue
+
+            # Split the gateway's Recipients array back into per-phone results
+            recipients = {r.get('number'): r for r in
+                          response['data'].get('SMSMessageData', {}).get('Recipients', [])}
+            for phone, number in zip(batch, normalized):
+                recipient = recipients.get(number)
+                if recipient is None:
+                    result = {'success': False, 'error': 'No delivery status returned'}
+                elif recipient.get('statusCode') in _ACCEPTED_CODES:
+                    result = {'success': True, 'data': recipient}
+                else:
+                    result = {'success': False, 'error': recipient.get('status', 'Rejected'), 'data': recipient}
+                results.append({'phone': phone, 'result': result})
         return results
+
+
+# Shared instance, so the pooled session and rate limiter live for the whole process
+sms_service = SMSService()
@@ -184,16 +184,17 @@ class FaceMonitor {
     async sendSnapshot() {
         if (!this.sessionId || !this.isMonitoring) return;
         
-        const snapshot = this.canvas.toDataURL('image/jpeg', 0.6);
+        const snapshot = await new Promise(resolve => this.canvas.toBlob(resolve, 'image/jpeg', 0.6));
+        if (!snapshot) return;
+
+        const form = new FormData();
+        form.append('session_id', this.sessionId);
+        form.append('snapshot', snapshot, 'snapshot.jpg');
         
         try {
             await fetch('/upload_snapshot', {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    session_id: this.sessionId,
-                    snapshot: snapshot
-                })
+                body: form
             });
         } catch (err) {
             console.error('Snapshot upload failed:', err);
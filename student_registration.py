@@ -2,32 +2,36 @@ import os
 from werkzeug.utils import secure_filename
 from database import db, Student
 from config import Config
-from sqlalchemy.exc import OperationalError
-import time
+from security import ALLOWED_IMAGE_EXTENSIONS, UPLOAD_BUFFER_SIZE, SecurityUtils
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+def _duplicate_field(error):
+    """Message for a UNIQUE violation on student_id/email, None for other integrity errors."""
+    detail = str(error.orig).lower()
+    if 'unique' not in detail and 'duplicate' not in detail:
+        return None
+    # SQLite names the column as "student.email", Postgres as "Key (email)=..."
+    if 'student.student_id' in detail or '(student_id)' in detail:
+        return "Student ID already exists"
+    if 'student.email' in detail or '(email)' in detail:
+        return "Email already exists"
+    return None
+
 
 class StudentRegistration:
     def __init__(self):
-        self.allowed_extensions = {'png', 'jpg', 'jpeg'}
+        self.allowed_extensions = ALLOWED_IMAGE_EXTENSIONS
 
     def allowed_file(self, filename):
-        return '.' in filename and filename.rsplit('.', 1)[1].lower() in self.allowed_extensions
+        return SecurityUtils.allowed_file(filename, self.allowed_extensions)
 
     def register_student(self, name, student_id, email, photo_file=None, password=None):
-        # Check if student already exists
-        existing = Student.query.filter_by(student_id=student_id).first()
-        if existing:
-            return None, "Student ID already exists"
-
-        existing_email = Student.query.filter_by(email=email).first()
-        if existing_email:
-            return None, "Email already exists"
-
-        # Save photo if provided
+        # Duplicates are caught by the UNIQUE constraints on insert rather than
+        # two SELECTs up front, so the photo is only written once the row exists
         photo_path = None
         if photo_file and self.allowed_file(photo_file.filename):
             filename = secure_filename(f"{student_id}_{photo_file.filename}")
             photo_path = os.path.join(Config.STUDENT_PHOTOS_PATH, filename)
-            photo_file.save(photo_path)
 
         # Create student record
         student = Student(
@@ -41,30 +45,24 @@ class StudentRegistration:
         if password:
             student.set_password(password)
 
-        # Add to database with retry logic for locking issues
-        max_retries = 3
-        retry_count = 0
-        
-        while retry_count < max_retries:
-            try:
-                db.session.add(student)
-                db.session.commit()
-                return student, "Student registered successfully"
-                
-            except OperationalError as e:
-                if "database is locked" in str(e).lower():
-                    retry_count += 1
-                    db.session.rollback()
-                    time.sleep(0.5 * retry_count)  # Exponential backoff
-                    continue
-                else:
-                    db.session.rollback()
-                    raise e
-            except Exception as e:
-                db.session.rollback()
+        # Lock contention is absorbed by SQLite's busy_timeout (set on connect in
+        # app.py), so an OperationalError here is a real failure, not a retry cue
+        try:
+            db.session.add(student)
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            duplicate = _duplicate_field(e)
+            if duplicate is None:
                 raise e
-        
-        return None, f"Failed to register student after {max_retries} attempts due to database lock"
+            return None, duplicate
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+        if photo_path:
+            photo_file.save(photo_path, buffer_size=UPLOAD_BUFFER_SIZE)
+        return student, "Student registered successfully"
     
     def get_student(self, student_id):
         return Student.query.filter_by(student_id=student_id).first()
@@ -84,7 +82,7 @@ class StudentRegistration:
         if photo_file and self.allowed_file(photo_file.filename):
             filename = secure_filename(f"{student_id}_{photo_file.filename}")
             photo_path = os.path.join(Config.STUDENT_PHOTOS_PATH, filename)
-            photo_file.save(photo_path)
+            photo_file.save(photo_path, buffer_size=UPLOAD_BUFFER_SIZE)
             student.photo_path = photo_path
         
         db.session.commit()
@@ -102,8 +100,8 @@ class StudentRegistration:
     def delete_all_students(self):
         """Delete all students and return the count of deleted records."""
         try:
-            count = Student.query.count()
-            Student.query.delete()
+            # delete() returns the rowcount, so no separate COUNT(*) scan
+            count = Student.query.delete(synchronize_session=False)
             db.session.commit()
             return True, count, "All students deleted successfully"
         except OperationalError as e:
@@ -116,10 +114,8 @@ class StudentRegistration:
     def delete_cohort(self, cohort_name):
         """Delete all students belonging to a specific cohort."""
         try:
-            students = Student.query.filter_by(cohort=cohort_name).all()
-            count = len(students)
-            for student in students:
-                db.session.delete(student)
+            # One DELETE ... WHERE cohort = ?; rowcount comes back without loading rows
+            count = Student.query.filter_by(cohort=cohort_name).delete(synchronize_session=False)
             db.session.commit()
             return True, count, f"Cohort '{cohort_name}' deleted successfully"
         except OperationalError as e:
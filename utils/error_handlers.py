@@ -1,6 +1,7 @@
 from flask import jsonify
 import logging
 from functools import wraps
+import random
 import time
 
 # Configure logging
@@ -58,73 +59,35 @@ class FileUploadError(Exception):
         self.status_code = 400
         super().__init__(self.message)
 
+# Response label per application exception; one shared handler serves them all
+_ERROR_LABELS = {
+    AuthenticationError: 'Authentication Error',
+    AuthorizationError: 'Authorization Error',
+    ValidationError: 'Validation Error',
+    ResourceNotFoundError: 'Resource Not Found',
+    ExamError: 'Exam Error',
+    DatabaseError: 'Database Error',
+    ExternalServiceError: 'External Service Error',
+    FileUploadError: 'File Upload Error',
+}
+
+def _handle_app_error(error):
+    label = _ERROR_LABELS.get(type(error))
+    if label is None:
+        # Flask dispatches subclasses here too; resolve those along the MRO
+        label = next(_ERROR_LABELS[cls] for cls in type(error).__mro__ if cls in _ERROR_LABELS)
+    payload = {'error': label, 'message': error.message}
+    if isinstance(error, ValidationError):
+        payload['details'] = error.details
+        logger.error("%s: %s, details: %s", label, error.message, error.details)
+    else:
+        logger.error("%s: %s", label, error.message)
+    return jsonify(payload), error.status_code
+
 def register_error_handlers(app):
     """Register error handlers with the Flask app."""
-    
-    @app.errorhandler(AuthenticationError)
-    def handle_authentication_error(error):
-        logger.error(f"Authentication error: {error.message}")
-        return jsonify({
-            'error': 'Authentication Error',
-            'message': error.message
-        }), error.status_code
-    
-    @app.errorhandler(AuthorizationError)
-    def handle_authorization_error(error):
-        logger.error(f"Authorization error: {error.message}")
-        return jsonify({
-            'error': 'Authorization Error',
-            'message': error.message
-        }), error.status_code
-    
-    @app.errorhandler(ValidationError)
-    def handle_validation_error(error):
-        logger.error(f"Validation error: {error.message}, details: {error.details}")
-        return jsonify({
-            'error': 'Validation Error',
-            'message': error.message,
-            'details': error.details
-        }), error.status_code
-    
-    @app.errorhandler(ResourceNotFoundError)
-    def handle_resource_not_found_error(error):
-        logger.error(f"Resource not found: {error.message}")
-        return jsonify({
-            'error': 'Resource Not Found',
-            'message': error.message
-        }), error.status_code
-    
-    @app.errorhandler(ExamError)
-    def handle_exam_error(error):
-        logger.error(f"Exam error: {error.message}")
-        return jsonify({
-            'error': 'Exam Error',
-            'message': error.message
-        }), error.status_code
-    
-    @app.errorhandler(DatabaseError)
-    def handle_database_error(error):
-        logger.error(f"Database error: {error.message}")
-        return jsonify({
-            'error': 'Database Error',
-            'message': error.message
-        }), error.status_code
-    
-    @app.errorhandler(ExternalServiceError)
-    def handle_external_service_error(error):
-        logger.error(f"External service error: {error.message}")
-        return jsonify({
-            'error': 'External Service Error',
-            'message': error.message
-        }), error.status_code
-    
-    @app.errorhandler(FileUploadError)
-    def handle_file_upload_error(error):
-        logger.error(f"File upload error: {error.message}")
-        return jsonify({
-            'error': 'File Upload Error',
-            'message': error.message
-        }), error.status_code
+    for error_class in _ERROR_LABELS:
+        app.register_error_handler(error_class, _handle_app_error)
     
     @app.errorhandler(500)
     def handle_internal_error(error):
@@ -148,11 +111,15 @@ def retry(max_attempts=3, delay=1, backoff=2):
                 except Exception as e:
                     attempts += 1
                     if attempts == max_attempts:
-                        logger.error(f"Function {func.__name__} failed after {max_attempts} attempts: {str(e)}")
+                        logger.error("Function %s failed after %d attempts: %s", func.__name__, max_attempts, e)
                         raise
                     
-                    logger.warning(f"Attempt {attempts} failed for {func.__name__}: {str(e)}. Retrying in {current_delay}s...")
-                    time.sleep(current_delay)
+                    # Jitter spreads out callers that failed together (no thundering herd)
+                    sleep_for = current_delay * (0.5 + random.random())
+                    if logger.isEnabledFor(logging.WARNING):
+                        logger.warning("Attempt %d failed for %s: %s. Retrying in %.2fs...",
+                                       attempts, func.__name__, e, sleep_for)
+                    time.sleep(sleep_for)  # CLOCK_MONOTONIC-based, unaffected by NTP steps
                     current_delay *= backoff
             
         return wrapper
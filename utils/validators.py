@@ -1,7 +1,34 @@
 from marshmallow import Schema, fields, validate, validates_schema, ValidationError
+import fastjsonschema
 import re
 
-class StudentRegistrationSchema(Schema):
+# Deep-Fried Marshmallow generates a straight-line loader for a fixed schema instead
+# of marshmallow's per-field reflection loop; plain Schema if it isn't installed
+try:
+    from deepfriedmarshmallow import JitSchema
+except ImportError:
+    JitSchema = Schema
+
+# Compiled once at import instead of going through re's pattern cache per call
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_PHONE_RE = re.compile(r'^[\d\s\-\(\)\+]+$')
+_NON_DIGIT_RE = re.compile(r'\D')
+# Upper, lower, digit and special all present: one C-level pass for the common
+# (valid) case; per-rule messages are only worked out when it fails
+_STRONG_PASSWORD_RE = re.compile(r'(?=.*[A-Z])(?=.*[a-z])(?=.*\d)(?=.*[!@#$%^&*()_+\-=\[\]{}|;:,.<>?])', re.DOTALL)
+
+# /api/auth/change-password body; compiled once, raises JsonSchemaValueException
+validate_change_password = fastjsonschema.compile({
+    'type': 'object',
+    'required': ['old_password', 'new_password', 'confirm_password'],
+    'properties': {
+        'old_password': {'type': 'string'},
+        'new_password': {'type': 'string'},
+        'confirm_password': {'type': 'string'},
+    },
+})
+
+class StudentRegistrationSchema(JitSchema):
     first_name = fields.Str(required=True, validate=validate.Length(min=1, max=50))
     last_name = fields.Str(required=True, validate=validate.Length(min=1, max=50))
     email = fields.Email(required=True)
@@ -33,11 +60,13 @@ class GradeSubmissionSchema(Schema):
 
 def validate_email_format(email):
     """Validate email format using regex."""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
 
 def validate_password_strength(password):
     """Validate password strength."""
+    if len(password) >= 8 and _STRONG_PASSWORD_RE.match(password):
+        return True, []
+    
     errors = []
     
     if len(password) < 8:
@@ -60,8 +89,7 @@ def validate_password_strength(password):
 def validate_phone_format(phone):
     """Validate phone number format."""
     # Basic validation - allow digits, spaces, hyphens, parentheses, and plus signs
-    pattern = r'^[\d\s\-\(\)\+]+$'
-    return re.match(pattern, phone) is not None and len(re.sub(r'[^\d]', '', phone)) >= 10
+    return _PHONE_RE.match(phone) is not None and len(_NON_DIGIT_RE.sub('', phone)) >= 10
 
 def validate_json_input(data, schema_class):
     """Validate JSON input against a schema."""